@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 # arquivo: arte_fixed.py
-import io
 import os
 import math
 import textwrap
@@ -8,9 +7,12 @@ import argparse
 import subprocess
 from pathlib import Path
 
-import requests
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
+from img_cache import get_cache as get_image_cache
+from template_cache import Template, get_template, file_fingerprint
+from font_cache import cached_truetype
+
 # ======== CONSTANTES DO LAYOUT (fixo) ========
 W, H = 1080, 1920                          # canvas 9:16
 MARGIN_WHITE = 36                           # margem interna da caixa branca
@@ -28,21 +30,28 @@ SIZE_FOOT = 40                              # @assinatura
 
 ASSINATURA = "@BOCANOTROMBONELITORAL"      # rodapé dentro da caixa branca
 
+# altura da foto do topo; ajustada para ficar como o mock (~700–900 px)
+PHOTO_H = max(700, min(900, H - BAND_H - 600))
+
 # ======== util ========
-def load_image_any(url_or_path: str) -> Image.Image:
-    """Carrega imagem de URL (com headers p/ evitar 403) ou caminho local.
-       Garante modo RGB."""
+def load_image_any(url_or_path: str, cover=None) -> Image.Image:
+    """Carrega imagem de URL (com headers p/ evitar 403, via cache em disco)
+       ou caminho local. Garante modo RGB.
+       cover=(w, h): JPEG já decodificado reduzido, ainda cobrindo w x h."""
     if url_or_path.startswith("http"):
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
             "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
             "Referer": "https://google.com",
         }
-        r = requests.get(url_or_path, headers=headers, timeout=30)
-        r.raise_for_status()
-        img = Image.open(io.BytesIO(r.content))
+        # mesmo cache em disco do auto_reels_wp_publish
+        img = Image.open(get_image_cache().fetch(url_or_path, headers=headers, timeout=30))
     else:
         img = Image.open(url_or_path)
+    if cover and img.format == "JPEG":
+        scale = max(cover[0] / img.width, cover[1] / img.height)
+        if scale < 1:
+            img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
     # alguns formatos vêm como P/LA/RGBA: normaliza
     if img.mode in ("P", "LA"):
         img = img.convert("RGBA")
@@ -61,7 +70,7 @@ def cover_resize(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
     src_w, src_h = img.size
     scale = max(target_w / src_w, target_h / src_h)
     new_w, new_h = int(src_w * scale), int(src_h * scale)
-    img2 = img.resize((new_w, new_h), Image.LANCZOS)
+    img2 = img.resize((new_w, new_h), Image.LANCZOS, reducing_gap=3.0)
     # crop central
     left = (new_w - target_w) // 2
     top = (new_h - target_h) // 2
@@ -106,72 +115,97 @@ def draw_centered(draw, text, font, x, y, fill="white"):
     draw.text((x - w // 2, y - h // 2), text, font=font, fill=fill)
 
 
-# ========= render principal =========
-def render_card(bg_img: Image.Image, categoria: str, titulo: str, logo_path="logo_boca.png") -> Image.Image:
-    """
-    Monta a arte 1080x1920 no padrão fixo:
-      - Foto em cima com 'cover'
-      - Faixa preta (BAND_H)
-      - Logo central sobre a faixa
-      - Pílula vermelha da categoria
-      - Caixa branca com margem 36, título em Anton 55
-      - Rodapé dentro da caixa: @BOCANOTROMBONELITORAL Roboto 40
-    """
-    # Canvas
-    canvas = Image.new("RGB", (W, H), "black")
-    draw = ImageDraw.Draw(canvas)
+# ========= camada estática (montada uma vez, ver template_cache) =========
+# posições fixas do layout
+BAND_Y = PHOTO_H
+PILL_X = (W - PILL_W) // 2
+PILL_Y = BAND_Y + BAND_H                    # logo abaixo da faixa
+BOX_W = W - (MARGIN_WHITE * 2)              # caixa branca com margem lateral 36
+BOX_H = 500                                 # altura fixa, mantendo o look (~500 px)
+BOX_X1 = MARGIN_WHITE
+BOX_Y1 = PILL_Y + PILL_H + 24               # espaço entre pílula e caixa
+BOX_X2 = BOX_X1 + BOX_W
+BOX_Y2 = BOX_Y1 + BOX_H
 
-    # --- FOTO NO TOPO (altura até começo da faixa preta) ---
-    photo_h = H - (BAND_H + 0) - 600  # altura da foto; ajustei para ficar como seu mock
-    # Para ficar “como no mock”, a foto ocupa ~ 720–760 px; ajuste fino:
-    photo_h = max(700, min(900, photo_h))
-    photo_area = cover_resize(bg_img, W, photo_h)
-    canvas.paste(photo_area, (0, 0))
+
+def build_card_template(logo_path="logo_boca.png") -> Template:
+    """Faixa preta, logo, pílula vermelha, caixa branca e assinatura."""
+    base = Image.new("RGB", (W, H), "black")
+    draw = ImageDraw.Draw(base)
 
     # --- FAIXA PRETA ---
-    band_y = photo_h
-    draw.rectangle([0, band_y, W, band_y + BAND_H], fill="black")
+    draw.rectangle([0, BAND_Y, W, BAND_Y + BAND_H], fill="black")
 
     # --- LOGO CENTRAL SOBRE A FAIXA ---
+    overlays = []
     if Path(logo_path).exists():
         logo = Image.open(logo_path).convert("RGBA")
         # normaliza largura
         ratio = LOGO_W / logo.width
         logo = logo.resize((int(logo.width * ratio), int(logo.height * ratio)), Image.LANCZOS)
         lx = (W - logo.width) // 2
-        ly = band_y + (BAND_H - logo.height) // 2 - 10  # pequeno ajuste para cima
-        canvas.paste(logo, (lx, ly), mask=logo.split()[-1])
+        ly = BAND_Y + (BAND_H - logo.height) // 2 - 10  # pequeno ajuste para cima
+        base.paste(logo, (lx, ly), mask=logo.split()[-1])
+        if ly < PHOTO_H:
+            # a parte do logo que invade a foto precisa ir por cima dela
+            top = logo.crop((0, 0, logo.width, PHOTO_H - ly))
+            overlays.append((top, (lx, ly)))
 
     # --- PÍLULA VERMELHA DA CATEGORIA ---
-    cat_font = ImageFont.truetype(FONT_ROBOTO, SIZE_CAT)
-    cat_text = categoria.strip().upper()
-    pill_x = (W - PILL_W) // 2
-    pill_y = band_y + BAND_H  # logo abaixo da faixa
-    rounded_rectangle(draw, (pill_x, pill_y, pill_x + PILL_W, pill_y + PILL_H), PILL_RADIUS, fill="#E11D1D")
-    draw_centered(draw, cat_text, cat_font, W // 2, pill_y + PILL_H // 2, fill="white")
+    rounded_rectangle(draw, (PILL_X, PILL_Y, PILL_X + PILL_W, PILL_Y + PILL_H), PILL_RADIUS, fill="#E11D1D")
 
     # --- CAIXA BRANCA DA MANCHETE ---
-    # largura da caixa branca com margem lateral 36, conforme padrão
-    box_w = W - (MARGIN_WHITE * 2)
-    # altura variável, mas mantendo o look (cerca de 500 px)
-    box_h = 500
-    box_x1 = MARGIN_WHITE
-    box_y1 = pill_y + PILL_H + 24  # espaço entre pílula e caixa
-    box_x2 = box_x1 + box_w
-    box_y2 = box_y1 + box_h
-    draw.rectangle([box_x1, box_y1, box_x2, box_y2], fill="white")
+    draw.rectangle([BOX_X1, BOX_Y1, BOX_X2, BOX_Y2], fill="white")
+
+    # --- ASSINATURA (@BOCANOTROMBONELITORAL) ---
+    foot_font = cached_truetype(FONT_ROBOTO, SIZE_FOOT)
+    fw, fh = text_size(draw, ASSINATURA, foot_font)
+    fx = (W - fw) // 2
+    fy = BOX_Y2 - fh - 24
+    draw.text((fx, fy), ASSINATURA, font=foot_font, fill="#E7B10A")  # amarelo suave
+    return Template(base, overlays)
+
+
+def card_template(logo_path="logo_boca.png") -> Template:
+    config = {
+        "size": (W, H), "photo_h": PHOTO_H, "band_h": BAND_H, "logo_w": LOGO_W,
+        "pill": (PILL_W, PILL_H, PILL_RADIUS), "margin": MARGIN_WHITE,
+        "logo": file_fingerprint(logo_path), "foot": (ASSINATURA, SIZE_FOOT, file_fingerprint(FONT_ROBOTO)),
+    }
+    return get_template("card", config, lambda: build_card_template(logo_path))
+
+
+# ========= render principal =========
+def render_card(bg_img: Image.Image, categoria: str, titulo: str, logo_path="logo_boca.png") -> Image.Image:
+    """
+    Monta a arte 1080x1920 no padrão fixo:
+      - Foto em cima com 'cover'
+      - Faixa preta (BAND_H)
+      - Logo central sobre a faixa
+      - Pílula vermelha da categoria
+      - Caixa branca com margem 36, título em Anton 55
+      - Rodapé dentro da caixa: @BOCANOTROMBONELITORAL Roboto 40
+    Só foto, categoria e título são desenhados aqui; o resto vem do template.
+    """
+    # --- FOTO NO TOPO (altura até começo da faixa preta) ---
+    photo_area = cover_resize(bg_img, W, PHOTO_H)
+    canvas = card_template(logo_path).compose(photo_area, (0, 0))
+    draw = ImageDraw.Draw(canvas)
+
+    # --- CATEGORIA NA PÍLULA ---
+    cat_font = cached_truetype(FONT_ROBOTO, SIZE_CAT)
+    cat_text = categoria.strip().upper()
+    draw_centered(draw, cat_text, cat_font, W // 2, PILL_Y + PILL_H // 2, fill="white")
 
     # --- TÍTULO (Anton 55, caixa alta, centralizado) ---
-    title_font = ImageFont.truetype(FONT_ANTON, SIZE_TITLE)
+    title_font = cached_truetype(FONT_ANTON, SIZE_TITLE)
     title_text = " ".join(titulo.strip().upper().split())
-    inner_w = box_w - (MARGIN_WHITE * 1)  # pequena margem interna
+    inner_w = BOX_W - (MARGIN_WHITE * 1)  # pequena margem interna
     # quebra em linhas para caber
     lines = wrap_text_to_width(draw, title_text, title_font, inner_w)
-    # calcula altura total das linhas
     line_h = title_font.getbbox("A")[3] - title_font.getbbox("A")[1]
-    total_h = len(lines) * line_h + (len(lines) - 1) * 10
     # topo do texto dentro da caixa branca
-    ty = box_y1 + 32
+    ty = BOX_Y1 + 32
     # desenha cada linha centralizada
     for ln in lines:
         tw, _ = text_size(draw, ln, title_font)
@@ -179,13 +213,6 @@ def render_card(bg_img: Image.Image, categoria: str, titulo: str, logo_path="log
         draw.text((tx, ty), ln, font=title_font, fill="black")
         ty += line_h + 10
 
-    # --- ASSINATURA (@BOCANOTROMBONELITORAL) ---
-    foot_font = ImageFont.truetype(FONT_ROBOTO, SIZE_FOOT)
-    fw, fh = text_size(draw, ASSINATURA, foot_font)
-    fx = (W - fw) // 2
-    fy = box_y2 - fh - 24
-    draw.text((fx, fy), ASSINATURA, font=foot_font, fill="#E7B10A")  # amarelo suave
-
     return canvas
 
 
@@ -226,7 +253,7 @@ def main():
     args = ap.parse_args()
 
     Path("out").mkdir(exist_ok=True)
-    bg = load_image_any(args.img)
+    bg = load_image_any(args.img, cover=(W, PHOTO_H))
     card = render_card(bg, args.categoria, args.titulo)
     card.save(args.out, "JPEG", quality=95)
     print(f"✅ Arte: {args.out}")
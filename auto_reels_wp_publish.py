@@ -1,27 +1,60 @@
 # -*- coding: utf-8 -*-
 """
 Auto Reels (WP → FB + IG) – FULL (fix fontes e URLs relativas)
-- Busca posts do WordPress
+- Busca posts do WordPress (incremental: cursor date_gmt+id, ETag/If-Modified-Since, paginação)
 - Prefere imagem do conteúdo; se vier URL relativo, corrige com base do WP
+- Imagens de origem em cache no disco (out/img_cache, LRU + revalidação ETag)
 - Arte no padrão: topo imagem, faixa vermelha robusta (categoria), caixa branca com título (quebra sem vazar), logo acima da faixa, rodapé @BOCANOTROMBONELITORAL
-- Vídeo 10s (com áudio opcional audio_fundo.mp3)
-- Cloudinary -> Facebook (/videos) -> Instagram (REELS com espera FINISHED)
-- Salva IDs processados
+- Vídeo 10s (com áudio opcional audio_fundo.mp3), perfil x264 para foto parada;
+  a arte vai crua (RGB) pelo stdin do ffmpeg, prévia JPG só com SAVE_ART_JPEG=1
+- Cloudinary -> Facebook (/videos) -> Instagram (REELS; poller em background publica ao ficar FINISHED)
+  ou, com UPLOAD_TRANSPORT=graph, upload direto e retomável na Graph API (Cloudinary vira reserva)
+- Pipeline em estágios (arte / vídeo / upload / publicação) com filas limitadas
+- (opcional) webhook do WP (WEBHOOK_PORT) joga o post direto no pipeline; o polling fica de reserva
+- Estado por post em out/jobs.sqlite3 (retoma do estágio que faltou após crash)
 Requisitos:
-  pip install pillow requests python-dotenv cloudinary beautifulsoup4
+  pip install pillow requests python-dotenv cloudinary "httpx[http2]"
   FFmpeg no PATH
   .env: WP_URL, USER_ACCESS_TOKEN, FACEBOOK_PAGE_ID, INSTAGRAM_ID,
         CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
+        (opcional) PIPE_RENDER_WORKERS, PIPE_ENCODE_WORKERS, PIPE_UPLOAD_WORKERS,
+                   PIPE_PUBLISH_WORKERS, PIPE_QUEUE_SIZE,
+                   IG_POLL_FIRST, IG_POLL_FACTOR, IG_POLL_MAX, IG_POLL_MAX_WAIT,
+                   IMG_CACHE_DIR, IMG_CACHE_MAX_MB, IMG_CACHE_FRESH_S, IMG_MAX_MB,
+                   VIDEO_PROFILE, SAVE_ART_JPEG, VIDEO_SEGMENT_CACHE, VIDEO_CLIP_SECONDS,
+                   VIDEO_INTRO, VIDEO_OUTRO,
+                   FFMPEG_WORKERS, FFMPEG_THREADS, FFMPEG_TIMEOUT, FFMPEG_NICE,
+                   UPLOAD_TRANSPORT, UPLOAD_CHUNK_MB, GRAPH_URL, RUPLOAD_URL,
+                   GRAPH_SOFT_USAGE, GRAPH_MAX_PAUSE,
+                   NET_BACKEND, NET_MAX_CONNECTIONS, NET_HTTP2,
+                   SLEEP_BETWEEN_RUNS, POLL_MIN_S, POLL_MAX_S, POLL_TARGET_POSTS,
+                   WEBHOOK_PORT, WEBHOOK_HOST, WEBHOOK_SECRET, WP_EMBED,
+                   METRICS_FILE, METRICS_PORT, CLOUDINARY_UPLOAD_PREFIX, OUT_DIR
+Teste de carga offline: python standin_server.py --posts 50 (WP + Graph + Cloudinary falsos)
 Arquivos: (opcional) logo_boca.png, Anton-Regular.ttf, Roboto-Black.ttf, audio_fundo.mp3
 """
 
-import os, io, time, json, math, subprocess, textwrap, datetime
+import os, time, json, math, subprocess, datetime, threading, hashlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlencode
 import requests
-from bs4 import BeautifulSoup
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, features
 from dotenv import load_dotenv
+from pipeline import Pipeline, Stage
+from ffmpeg_pool import FFmpegPool
+from graph_upload import fb_chunked_upload, ig_resumable_upload
+from graph_limiter import GraphScheduler, GraphSession, GraphThrottled
+from net import make_session
+from poll_scheduler import PollScheduler
+from webhook import WebhookServer
+from post_html import post_record
+from metrics import Metrics, Span
+from ig_poller import ContainerPoller, backoff_delays
+from job_store import JobStore
+from img_cache import get_cache as get_image_cache
+from template_cache import Template, get_template, file_fingerprint, config_key
+from font_cache import cached_truetype, word_width, space_width
 
 # ====== ENV ======
 load_dotenv()
@@ -30,14 +63,18 @@ TOKEN       = os.getenv("USER_ACCESS_TOKEN", "")
 PAGE_ID     = os.getenv("FACEBOOK_PAGE_ID", "")
 IG_ID       = os.getenv("INSTAGRAM_ID", "")
 API_V       = os.getenv("API_VERSION", "v23.0")
+GRAPH_URL   = os.getenv("GRAPH_URL", "https://graph.facebook.com").rstrip("/")
+RUPLOAD_URL = os.getenv("RUPLOAD_URL", "https://rupload.facebook.com").rstrip("/")
+GRAPH       = f"{GRAPH_URL}/{API_V}"
 
 CLOUD_NAME  = os.getenv("CLOUDINARY_CLOUD_NAME", "")
 CLOUD_KEY   = os.getenv("CLOUDINARY_API_KEY", "")
 CLOUD_SEC   = os.getenv("CLOUDINARY_API_SECRET", "")
+CLOUD_UPLOAD_PREFIX = os.getenv("CLOUDINARY_UPLOAD_PREFIX", "").rstrip("/")  # vazio = API real
 
 BASE = Path(__file__).parent
-OUT  = BASE / "out"
-OUT.mkdir(exist_ok=True)
+OUT  = Path(os.getenv("OUT_DIR", str(BASE / "out")))   # estado/saídas (outro diretório p/ testes de carga)
+OUT.mkdir(parents=True, exist_ok=True)
 
 # ====== AJUSTES VISUAIS (mexa só aqui) ======
 W, H                 = 1080, 1920
@@ -72,20 +109,79 @@ WHITE_COLOR          = (255, 255, 255)
 FONT_ANTON_PATH      = BASE / "Anton-Regular.ttf"
 FONT_ROBOTO_PATH     = BASE / "Roboto-Black.ttf"
 
+IMG_MAX_BYTES        = int(float(os.getenv("IMG_MAX_MB", "25")) * (1 << 20))  # teto do download da foto
+
 VIDEO_SECONDS        = 10
-SLEEP_BETWEEN_RUNS   = 300
+VIDEO_PROFILE        = os.getenv("VIDEO_PROFILE", "still")          # ver VIDEO_PROFILES
+SAVE_ART_JPEG        = os.getenv("SAVE_ART_JPEG", "0") == "1"       # grava out/arte_{id}.jpg (prévia)
+VIDEO_SEGMENT_CACHE  = os.getenv("VIDEO_SEGMENT_CACHE", "1") == "1" # áudio AAC em cache, copiado por post
+VIDEO_CLIP_SECONDS   = float(os.getenv("VIDEO_CLIP_SECONDS", "0"))  # opcional: clipe codificado e repetido (0 = vídeo inteiro)
+# clipe curto = 1 keyframe por repetição: encode ~3x mais rápido, mas mp4 muitas vezes maior
+# (sobe pro Cloudinary e é baixado de novo pelo FB/IG); só vale com CPU apertada e banda sobrando
+FFMPEG_WORKERS       = int(os.getenv("FFMPEG_WORKERS", "1"))        # ffmpeg simultâneos
+FFMPEG_THREADS       = int(os.getenv("FFMPEG_THREADS", "2"))        # -threads por job (0 = automático)
+FFMPEG_TIMEOUT       = float(os.getenv("FFMPEG_TIMEOUT", "180"))    # mata o ffmpeg após (s)
+FFMPEG_NICE          = int(os.getenv("FFMPEG_NICE", "10"))          # prioridade baixa (0 = normal)
+VIDEO_INTRO          = os.getenv("VIDEO_INTRO", "")                 # (opcional) vinheta de abertura
+VIDEO_OUTRO          = os.getenv("VIDEO_OUTRO", "")                 # (opcional) vinheta de encerramento
+SLEEP_BETWEEN_RUNS   = int(os.getenv("SLEEP_BETWEEN_RUNS", "300"))  # intervalo sem histórico e teto em hora com posts (s)
+POLL_MIN_S           = float(os.getenv("POLL_MIN_S", "60"))          # intervalo mín. em hora movimentada
+POLL_MAX_S           = float(os.getenv("POLL_MAX_S", "1800"))        # intervalo máx. (só em hora sem posts)
+POLL_TARGET_POSTS    = float(os.getenv("POLL_TARGET_POSTS", "0.3"))  # posts esperados por ciclo
+WP_EMBED             = os.getenv("WP_EMBED", "0") == "1"             # _embed: imagem destacada + categorias reais
+METRICS_FILE         = os.getenv("METRICS_FILE", str(OUT / "metrics.jsonl"))  # spans em JSON lines ("" = não grava)
+METRICS_PORT         = int(os.getenv("METRICS_PORT", "0"))            # /metrics estilo Prometheus (0 = desligado)
+WEBHOOK_PORT         = int(os.getenv("WEBHOOK_PORT", "0"))            # receptor de webhook do WP (0 = desligado)
+WEBHOOK_HOST         = os.getenv("WEBHOOK_HOST", "127.0.0.1")         # 0.0.0.0 para aceitar de fora
+WEBHOOK_SECRET       = os.getenv("WEBHOOK_SECRET", "")                # X-Webhook-Secret esperado
+UPLOAD_TRANSPORT     = os.getenv("UPLOAD_TRANSPORT", "cloudinary")  # cloudinary | graph (upload direto)
+UPLOAD_CHUNK_MB      = float(os.getenv("UPLOAD_CHUNK_MB", "8"))      # pedaço do rupload do IG
+NET_BACKEND          = os.getenv("NET_BACKEND", "auto")              # auto | httpx | requests
+NET_MAX_CONNECTIONS  = int(os.getenv("NET_MAX_CONNECTIONS", "50"))   # pool de conexões
+NET_HTTP2            = os.getenv("NET_HTTP2", "1") == "1"            # HTTP/2 quando o servidor aceita
+GRAPH_SOFT_USAGE     = float(os.getenv("GRAPH_SOFT_USAGE", "70"))    # % de uso a partir do qual desacelera
+GRAPH_MAX_PAUSE      = float(os.getenv("GRAPH_MAX_PAUSE", "900"))    # pausa máx. por limite (s); acima, o job falha
+# chamadas por minuto e rajada por família de endpoint da Graph
+GRAPH_LIMITS = {
+    "videos":        (10, 3),
+    "media":         (10, 3),
+    "media_publish": (10, 2),
+    "status":        (60, 10),
+    "other":         (30, 5),
+}
+JOB_MAX_ATTEMPTS     = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))    # desiste do post após N falhas
+
+# ====== PIPELINE (concorrência por estágio, via .env) ======
+PIPE_RENDER_WORKERS  = int(os.getenv("PIPE_RENDER_WORKERS", "1"))   # CPU: arte
+PIPE_ENCODE_WORKERS  = int(os.getenv("PIPE_ENCODE_WORKERS", "1"))   # CPU: ffmpeg
+PIPE_UPLOAD_WORKERS  = int(os.getenv("PIPE_UPLOAD_WORKERS", "2"))   # rede: Cloudinary
+PIPE_PUBLISH_WORKERS = int(os.getenv("PIPE_PUBLISH_WORKERS", "2"))  # rede: Graph API
+PIPE_QUEUE_SIZE      = int(os.getenv("PIPE_QUEUE_SIZE", "2"))       # fila entre estágios
+
+# ====== IG: poller de containers (backoff adaptativo) ======
+IG_POLL_FIRST        = float(os.getenv("IG_POLL_FIRST", "3"))       # 1ª checagem (s)
+IG_POLL_FACTOR       = float(os.getenv("IG_POLL_FACTOR", "1.6"))    # multiplica a cada checagem
+IG_POLL_MAX          = float(os.getenv("IG_POLL_MAX", "30"))        # teto entre checagens (s)
+IG_POLL_MAX_WAIT     = int(os.getenv("IG_POLL_MAX_WAIT", "480"))    # desiste após (s)
 
 # ====== LOG ======
+LOG_LOCK = threading.Lock()
 def log(msg, level="INFO"):
     ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{ts} | {level} | {msg}", flush=True)
+    with LOG_LOCK:  # várias threads do pipeline logam ao mesmo tempo
+        print(f"{ts} | {level} | {msg}", flush=True)
+
+# ====== MÉTRICAS (tempo por estágio/post) ======
+METRICS = Metrics(METRICS_FILE or None)
 
 # ====== HTTP SESSION ======
-SESSION = requests.Session()
-ADAPTER = requests.adapters.HTTPAdapter(max_retries=3)
-SESSION.mount("http://", ADAPTER)
-SESSION.mount("https://", ADAPTER)
-SESSION.headers.update({"User-Agent": "AutoReelsBot/1.0"})
+# httpx assíncrono (pool + HTTP/2) atrás de uma fachada síncrona; sem httpx, requests
+SESSION = make_session(NET_BACKEND, headers={"User-Agent": "AutoReelsBot/1.0"},
+                       max_connections=NET_MAX_CONNECTIONS, http2=NET_HTTP2)
+# chamadas da Graph passam pelo agendador (token bucket por família + cabeçalhos de uso)
+GRAPH_SESSION = GraphSession(SESSION, GraphScheduler(
+    GRAPH_LIMITS, soft_usage=GRAPH_SOFT_USAGE, max_pause=GRAPH_MAX_PAUSE, log=log,
+    on_retry=METRICS.note_retry))
 
 # ====== CLOUDINARY ======
 def cloudinary_init():
@@ -97,30 +193,133 @@ def cloudinary_init():
             cloud_name=CLOUD_NAME,
             api_key=CLOUD_KEY,
             api_secret=CLOUD_SEC,
-            secure=True
+            secure=True,
+            **({"upload_prefix": CLOUD_UPLOAD_PREFIX} if CLOUD_UPLOAD_PREFIX else {})
         )
         return True
     except Exception as e:
         log(f"Cloudinary init falhou: {e}", "ERROR")
         return False
 
-def cloudinary_upload_video(path: Path) -> str:
+def cloudinary_upload_video(path: Path, public_id: str | None = None) -> str:
     import cloudinary.uploader
+    # public_id derivado do conteúdo: o mesmo mp4 cai no mesmo recurso, sem sobrescrever
     res = cloudinary.uploader.upload_large(
-        str(path), resource_type="video",
-        timeout=600, folder="auto_reels", overwrite=True
+        str(path), resource_type="video", public_id=public_id,
+        timeout=600, folder="auto_reels", overwrite=public_id is None
     )
     return res["secure_url"]
 
 # ====== WP ======
-def wp_latest_posts(limit=5):
-    url = f"{WP_URL}/wp-json/wp/v2/posts?per_page={limit}&orderby=date&_fields=id,title,excerpt,featured_media,content,link,categories"
-    r = SESSION.get(url, timeout=30)
+# --- busca incremental: cursor (date_gmt, id) + ETag/If-Modified-Since ---
+WP_FIELDS      = "id,date_gmt,modified_gmt,title,excerpt,featured_media,content,link,categories"
+WP_CURSOR_FILE = OUT / "wp_cursor.json"
+# modo _embed: sem content; imagem destacada e categorias vêm embutidas (poucos KB por post)
+WP_FIELDS_EMBED = "id,date_gmt,modified_gmt,title,link,categories,featured_media,_links,_embedded"
+WP_EMBEDS      = "wp:featuredmedia,wp:term"
+WP_COND        = {}  # url+params -> {"etag": ..., "last_modified": ...}
+WP_MORE        = False  # a última busca parou em max_pages com mais páginas no servidor
+
+def wp_fields() -> dict:
+    if WP_EMBED:
+        return {"_fields": WP_FIELDS_EMBED, "_embed": WP_EMBEDS}
+    return {"_fields": WP_FIELDS}
+
+def load_wp_cursor():
+    if WP_CURSOR_FILE.exists():
+        try:
+            return json.loads(WP_CURSOR_FILE.read_text(encoding="utf-8"))
+        except:
+            return None
+    return None
+
+def save_wp_cursor(cur: dict):
+    WP_CURSOR_FILE.write_text(json.dumps(cur), encoding="utf-8")
+
+def wp_get_conditional(url: str, params: dict):
+    """GET com If-None-Match/If-Modified-Since. 304 => (None, resp)."""
+    key = url + "?" + urlencode(sorted(params.items()))
+    headers = {}
+    cond = WP_COND.get(key)
+    if cond:
+        if cond.get("etag"):
+            headers["If-None-Match"] = cond["etag"]
+        if cond.get("last_modified"):
+            headers["If-Modified-Since"] = cond["last_modified"]
+    with METRICS.span("wp_fetch", page=params.get("page", 1)) as sp:
+        r = SESSION.get(url, params=params, headers=headers, timeout=30)
+        sp.set(bytes=len(r.content), http=r.status_code)
+        if r.status_code == 304:
+            return None, r
+        r.raise_for_status()
+    etag, lm = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    if etag or lm:
+        WP_COND[key] = {"etag": etag, "last_modified": lm}
+        if len(WP_COND) > 32:
+            WP_COND.pop(next(iter(WP_COND)))
+    return r.json(), r
+
+def _post_key(p):
+    return (p.get("date_gmt") or "", int(p["id"]))
+
+def wp_new_posts(limit=5, max_pages=10):
+    """Só posts mais novos que o cursor; pagina se chegou mais que `limit`."""
+    global WP_MORE
+    url = f"{WP_URL}/wp-json/wp/v2/posts"
+    cur = load_wp_cursor()
+    WP_MORE = False
+    if not cur:
+        # 1ª vez: só os `limit` posts mais recentes
+        data, _ = wp_get_conditional(url, {"per_page": limit, "orderby": "date", **wp_fields()})
+        posts = data or []
+    else:
+        # `after` é exclusivo e ignora o id: volta 1s e filtra por (date_gmt, id)
+        after = datetime.datetime.fromisoformat(cur["date_gmt"]) - datetime.timedelta(seconds=1)
+        params = {"per_page": limit, "orderby": "date", "order": "asc", "after": after.isoformat(),
+                  "dates_are_gmt": "true", **wp_fields()}
+        posts = []
+        for page in range(1, max_pages + 1):
+            data, r = wp_get_conditional(url, {**params, "page": page})
+            if not data:
+                break
+            posts += data
+            if page >= int(r.headers.get("X-WP-TotalPages", page)) or len(data) < limit:
+                break
+            WP_MORE = page == max_pages
+        last = (cur["date_gmt"], int(cur["id"]))
+        posts = [p for p in posts if _post_key(p) > last]
+    if posts and all(p.get("date_gmt") for p in posts):
+        newest = max(posts, key=_post_key)
+        save_wp_cursor({"date_gmt": newest["date_gmt"], "id": int(newest["id"])})
+    return posts
+
+def wp_get_post(pid: str) -> dict:
+    r = SESSION.get(f"{WP_URL}/wp-json/wp/v2/posts/{pid}", params=wp_fields(), timeout=30)
     r.raise_for_status()
     return r.json()
 
+def wp_fetch_content(post):
+    """Modo _embed sem imagem destacada: busca o content só deste post."""
+    r = SESSION.get(f"{WP_URL}/wp-json/wp/v2/posts/{post['id']}", params={"_fields": "content"}, timeout=30)
+    r.raise_for_status()
+    post["content"] = r.json().get("content") or {}
+
+def embedded_category_names(post) -> list[str]:
+    from html import unescape
+    for group in (post.get("_embedded") or {}).get("wp:term") or []:
+        names = [unescape(t["name"]) for t in group or []
+                 if isinstance(t, dict) and t.get("taxonomy") == "category" and t.get("name")
+                 and t.get("slug") not in ("uncategorized", "sem-categoria")]
+        if names:
+            return names
+    return []
+
 def pick_category_name(post):
-    t = post.get("title", {}).get("rendered", "") or ""
+    names = embedded_category_names(post)
+    if names:
+        return names[0]
+    # sem termos embutidos: heurística pelo título
+    t = post_record(post).title_raw
     if "Polícia" in t or "🚔" in t or "🚨" in t:
         return "POLÍCIA"
     if "Pronto Falei" in t or "‼️" in t:
@@ -128,34 +327,83 @@ def pick_category_name(post):
     return "NOTÍCIAS"
 
 def extract_title_text(post) -> str:
-    from html import unescape
-    raw = post.get("title", {}).get("rendered", "") or ""
-    soup = BeautifulSoup(raw, "html.parser")
-    txt = soup.get_text(" ", strip=True)
-    return unescape(txt)
+    return post_record(post).title
+
+def abs_wp_url(src: str) -> str:
+    # corrige URL relativa
+    if src.startswith("//"):
+        return "https:" + src
+    if src.startswith("/"):
+        return urljoin(WP_URL, src)
+    if src.lower().startswith("http"):
+        return src
+    # qualquer outra coisa, tenta juntar
+    return urljoin(WP_URL + "/", src)
+
+def pick_srcset(srcset: str, need_w: int) -> str | None:
+    """Menor candidato 'url 1200w' do srcset com largura >= need_w."""
+    best = None
+    for cand in (srcset or "").split(","):
+        parts = cand.strip().split()
+        if len(parts) != 2 or not parts[1].endswith("w") or not parts[1][:-1].isdigit():
+            continue
+        w = int(parts[1][:-1])
+        if w >= need_w and (best is None or w < best[0]):
+            best = (w, parts[0])
+    return best[1] if best else None
+
+def cover_min_width(img_w, img_h, box_w=W, box_h=TOP_IMAGE_H) -> int:
+    # largura mínima da variante para ainda cobrir box_w x box_h
+    try:
+        return max(box_w, math.ceil(box_h * int(img_w) / int(img_h)))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return box_w
+
+def featured_image_url(post, box_w=W, box_h=TOP_IMAGE_H) -> str | None:
+    """Imagem destacada embutida (_embed): menor tamanho de media_details.sizes que cobre a área."""
+    media = ((post.get("_embedded") or {}).get("wp:featuredmedia") or [None])[0]
+    if not isinstance(media, dict) or media.get("media_type", "image") != "image":
+        return None   # sem destaque, ou erro de permissão embutido no lugar
+    best = None
+    for size in ((media.get("media_details") or {}).get("sizes") or {}).values():
+        try:
+            w, h = int(size["width"]), int(size["height"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if w >= box_w and h >= box_h and size.get("source_url") and (best is None or w * h < best[0]):
+            best = (w * h, size["source_url"])
+    url = best[1] if best else media.get("source_url")
+    return abs_wp_url(url) if url else None
+
+def post_image_url(post) -> str | None:
+    url = featured_image_url(post)
+    if url:
+        return url
+    if WP_EMBED and "content" not in post:
+        wp_fetch_content(post)   # reserva: content completo só deste post
+    return first_image_from_content(post)
 
 def first_image_from_content(post) -> str | None:
-    html = post.get("content", {}).get("rendered", "") or ""
-    soup = BeautifulSoup(html, "html.parser")
-    img = soup.find("img")
-    if img and img.get("src"):
-        src = img["src"]
-        # corrige URL relativa
-        if src.startswith("//"):
-            return "https:" + src
-        if src.startswith("/"):
-            return urljoin(WP_URL, src)
-        if src.lower().startswith("http"):
-            return src
-        # qualquer outra coisa, tenta juntar
-        return urljoin(WP_URL + "/", src)
+    rec = post_record(post)   # 1º <img> achado numa varredura que para nele
+    if rec.img_src:
+        # prefere a menor variante do srcset que ainda cobre a área da foto
+        src = pick_srcset(rec.img_srcset, cover_min_width(rec.img_width, rec.img_height)) or rec.img_src
+        return abs_wp_url(src)
     return None
 
-def download_image_rgb(url: str) -> Image.Image | None:
+def download_image_rgb(url: str, cover: tuple[int, int] | None = None) -> Image.Image | None:
     try:
-        r = SESSION.get(url, timeout=30)
-        r.raise_for_status()
-        img = Image.open(io.BytesIO(r.content))
+        # download em streaming com teto de bytes (IMG_MAX_MB)
+        with METRICS.span("download_image") as sp:
+            path = get_image_cache().fetch(url, session=SESSION, timeout=30, max_bytes=IMG_MAX_BYTES)
+            sp.set(bytes=path.stat().st_size)
+        img = Image.open(path)
+        if cover and img.format == "JPEG":
+            # decodifica já reduzido (DCT 1/2, 1/4, 1/8), ainda cobrindo o alvo
+            sw, sh = img.size
+            scale = max(cover[0] / sw, cover[1] / sh)
+            if scale < 1:
+                img.draft("RGB", (math.ceil(sw * scale), math.ceil(sh * scale)))
         if img.mode not in ("RGB", "RGBA"):
             img = img.convert("RGB")
         else:
@@ -169,25 +417,31 @@ def object_fit_cover(src: Image.Image, box_w: int, box_h: int) -> Image.Image:
     sw, sh = src.size
     scale = max(box_w / sw, box_h / sh)
     nw, nh = int(sw * scale), int(sh * scale)
-    img = src.resize((nw, nh), Image.LANCZOS)
+    # reducing_gap: reduz por inteiro antes do LANCZOS (bem mais rápido em fotos grandes)
+    img = src.resize((nw, nh), Image.LANCZOS, reducing_gap=3.0)
     x = (nw - box_w) // 2
     y = (nh - box_h) // 2
     return img.crop((x, y, x + box_w, y + box_h))
 
 # ====== FONTES (com fallback) ======
+# Pillow >= 10 removeu ImageFont.LAYOUT_RAQM (o truetype falhava e caía na
+# fonte default); sem libraqm instalada, usa o layout básico
+FONT_LAYOUT = ImageFont.Layout.RAQM if features.check("raqm") else ImageFont.Layout.BASIC
+
 def try_truetype(paths, size):
     """
     paths: lista de caminhos possíveis (.ttf). Retorna a primeira que abrir.
     fallback final: DejaVuSans.ttf do PIL (vem junto) — evita 'cannot open resource'
+    Fontes ficam em cache por (caminho, tamanho, engine): ver font_cache.
     """
     for p in paths:
         try:
-            return ImageFont.truetype(str(p), size=size, layout_engine=ImageFont.LAYOUT_RAQM)
+            return cached_truetype(str(p), size, FONT_LAYOUT)
         except Exception:
             continue
     # fallback PIL
     try:
-        return ImageFont.truetype("DejaVuSans.ttf", size=size, layout_engine=ImageFont.LAYOUT_RAQM)
+        return cached_truetype("DejaVuSans.ttf", size, FONT_LAYOUT)
     except Exception:
         # último recurso: fonte PIL default (sem RAQM)
         return ImageFont.load_default()
@@ -201,6 +455,11 @@ def font_roboto_black(size):
     return try_truetype(candidates, size)
 
 # ====== TEXTO ======
+def text_block_height(font, n_lines, line_spacing=1.0) -> int:
+    # mesma conta usada para desenhar e para ajustar o título
+    ascent, descent = font.getmetrics()
+    return int(n_lines * (ascent + descent) * line_spacing)
+
 def draw_centered_text(draw, text, font, box, fill=(255,255,255), line_spacing=1.0):
     x0, y0, x1, y1 = box
     w_box = x1 - x0
@@ -208,7 +467,7 @@ def draw_centered_text(draw, text, font, box, fill=(255,255,255), line_spacing=1
     # altura
     ascent, descent = font.getmetrics()
     line_h = ascent + descent
-    total_h = int(sum((line_h * line_spacing) for _ in lines))
+    total_h = text_block_height(font, len(lines), line_spacing)
     y = y0 + ( (y1 - y0) - total_h ) // 2
     for line in lines:
         tw = font.getlength(line)
@@ -216,45 +475,126 @@ def draw_centered_text(draw, text, font, box, fill=(255,255,255), line_spacing=1
         draw.text((tx, y), line, font=font, fill=fill)
         y += int(line_h * line_spacing)
 
+def wrap_to_width(font, text, max_w) -> list[str]:
+    wrapped = []
+    space = space_width(font)
+    for paragraph in text.split("\n"):
+        words = paragraph.strip().split()
+        if not words:
+            wrapped.append("")
+            continue
+        # largura somada das palavras em cache (sem medir cada prefixo)
+        line, line_w = [words[0]], word_width(font, words[0])
+        for w in words[1:]:
+            cand_w = line_w + space + word_width(font, w)
+            if cand_w <= max_w:
+                line.append(w)
+                line_w = cand_w
+            else:
+                wrapped.append(" ".join(line))
+                line, line_w = [w], word_width(font, w)
+        wrapped.append(" ".join(line))
+    return wrapped
+
+def ellipsize(font, text, max_w, ellipsis="…") -> str:
+    """Maior prefixo de `text` que, com '…', cabe em max_w pixels."""
+    if font.getlength(text + ellipsis) <= max_w:
+        return text + ellipsis
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if font.getlength(text[:mid].rstrip() + ellipsis) <= max_w:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + ellipsis
+
 def fit_title_in_box(draw, text, font_builder, box, max_size, min_size, max_lines, line_spacing=1.05):
+    """Maior tamanho (passo de 1 px) em que o título cabe em largura, altura e
+    max_lines. Busca binária: ~5 layouts em vez de testar tamanho a tamanho.
+    Se nem o mínimo cabe, corta com '…' medido em pixels."""
     x0, y0, x1, y1 = box
     Wb, Hb = x1 - x0, y1 - y0
-    for size in range(max_size, min_size - 1, -2):
+    max_w = Wb - 2
+
+    def layout(size):
         font = font_builder(size)
-        # wrap por largura
-        wrapped = []
-        for paragraph in text.split("\n"):
-            words = paragraph.strip().split()
-            if not words:
-                wrapped.append("")
-                continue
-            line = words[0]
-            for w in words[1:]:
-                if font.getlength(line + " " + w) <= (Wb - 2):
-                    line += " " + w
-                else:
-                    wrapped.append(line)
-                    line = w
-            wrapped.append(line)
-        if len(wrapped) > max_lines:
-            wrapped = wrapped[:max_lines-1] + [wrapped[max_lines-1] + "…"]
-        ascent, descent = font.getmetrics()
-        line_h = ascent + descent
-        total_h = int(len(wrapped) * line_h * line_spacing)
-        if total_h <= Hb:
-            return font, "\n".join(wrapped)
-    # fallback
-    return font_builder(min_size), textwrap.shorten(text, width=120, placeholder="…")
+        lines = wrap_to_width(font, text, max_w)
+        fits = (len(lines) <= max_lines
+                and text_block_height(font, len(lines), line_spacing) <= Hb
+                and all(word_width(font, ln) <= max_w for ln in lines if " " not in ln))
+        return font, lines, fits
+
+    lo, hi, best = min_size, max_size, None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        font, lines, fits = layout(mid)
+        if fits:
+            best = (font, lines)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+    if best:
+        return best[0], "\n".join(best[1])
+
+    # fallback: tamanho mínimo, só as linhas que cabem, última com '…'
+    font, lines, _ = layout(min_size)
+    n = max_lines
+    while n > 1 and text_block_height(font, n, line_spacing) > Hb:
+        n -= 1
+    kept = [ln if font.getlength(ln) <= max_w else ellipsize(font, ln, max_w) for ln in lines[:n]]
+    if len(lines) > n and not kept[-1].endswith("…"):
+        kept[-1] = ellipsize(font, kept[-1], max_w)
+    return font, "\n".join(kept)
 
 # ====== ARTE ======
+def build_art_template() -> Template:
+    """Tudo que não muda entre posts: fundo, faixa vermelha, caixa branca, rodapé e logo."""
+    base = Image.new("RGB", (W, H), BG_FILL_COLOR)
+    draw = ImageDraw.Draw(base)
+    y_red1 = TOP_IMAGE_H + RED_BAR_H
+    draw.rectangle([0, TOP_IMAGE_H, W, y_red1], fill=RED_COLOR)
+    draw.rectangle([0, y_red1, W, y_red1 + WHITE_BOX_H], fill=WHITE_COLOR)
+
+    # rodapé
+    rod_font = font_roboto_black(RODAPE_SIZE)
+    rod_w = rod_font.getlength(RODAPE_TXT)
+    rx = (W - int(rod_w))//2
+    draw.text((rx, RODAPE_Y), RODAPE_TXT, font=rod_font, fill=WHITE_COLOR)
+
+    # logo (opcional) — fica sobre a foto, então vai como overlay
+    overlays = []
+    if LOGO_PATH.exists():
+        try:
+            logo = Image.open(LOGO_PATH).convert("RGBA")
+            scale = min(LOGO_MAX_W / logo.width, 1.0)
+            nw, nh = int(logo.width * scale), int(logo.height * scale)
+            logo = logo.resize((nw, nh), Image.LANCZOS)
+            overlays.append((logo, ((W - nw)//2, max(0, LOGO_Y_FROM_TOPIMG - nh))))
+        except Exception as e:
+            log(f"⚠️  Erro ao aplicar logo: {e}", "INFO")
+    return Template(base, overlays)
+
+def art_template() -> Template:
+    config = {
+        "size": (W, H), "top_h": TOP_IMAGE_H, "red_h": RED_BAR_H, "white_h": WHITE_BOX_H,
+        "colors": (BG_FILL_COLOR, RED_COLOR, WHITE_COLOR),
+        "logo": (file_fingerprint(LOGO_PATH), LOGO_MAX_W, LOGO_Y_FROM_TOPIMG),
+        "rodape": (RODAPE_TXT, RODAPE_SIZE, RODAPE_Y, file_fingerprint(FONT_ROBOTO_PATH), int(FONT_LAYOUT)),
+    }
+    return get_template("arte", config, build_art_template)
+
 def render_art(post, save_path: Path) -> Path:
-    canvas = Image.new("RGB", (W, H), BG_FILL_COLOR)
-    draw = ImageDraw.Draw(canvas)
+    canvas = render_art_image(post)
+    canvas.save(save_path, "JPEG", quality=92, optimize=True, progressive=True)
+    return save_path
 
+def render_art_image(post) -> Image.Image:
+    """Arte em memória (RGB W x H); o pipeline manda direto pro ffmpeg."""
     # imagem do conteúdo
-    img_url = first_image_from_content(post)
+    img_url = post_image_url(post)
     if img_url:
-        bg = download_image_rgb(img_url)
+        bg = download_image_rgb(img_url, cover=(W, TOP_IMAGE_H))
     else:
         bg = None
 
@@ -262,26 +602,14 @@ def render_art(post, save_path: Path) -> Path:
         top = Image.new("RGB", (W, TOP_IMAGE_H), (20,20,20))
     else:
         top = object_fit_cover(bg, W, TOP_IMAGE_H)
-    canvas.paste(top, (0, 0))
 
-    # logo (opcional)
-    if LOGO_PATH.exists():
-        try:
-            logo = Image.open(LOGO_PATH).convert("RGBA")
-            scale = min(LOGO_MAX_W / logo.width, 1.0)
-            nw, nh = int(logo.width * scale), int(logo.height * scale)
-            logo = logo.resize((nw, nh), Image.LANCZOS)
-            lx = (W - nw)//2
-            ly = max(0, LOGO_Y_FROM_TOPIMG - nh)
-            canvas.paste(logo, (lx, ly), logo)
-        except Exception as e:
-            log(f"⚠️  Erro ao aplicar logo: {e}", "INFO")
+    # base pré-renderizada + foto + logo; só o texto é desenhado por post
+    canvas = art_template().compose(top, (0, 0))
+    draw = ImageDraw.Draw(canvas)
 
-    # faixa vermelha (categoria)
+    # categoria (sobre a faixa vermelha)
     y_red0 = TOP_IMAGE_H
     y_red1 = TOP_IMAGE_H + RED_BAR_H
-    draw.rectangle([0, y_red0, W, y_red1], fill=RED_COLOR)
-
     categoria = pick_category_name(post).upper()
     cat_font = font_roboto_black(CATEGORY_TXT_SIZE)
     cat_w = cat_font.getlength(categoria)
@@ -291,11 +619,9 @@ def render_art(post, save_path: Path) -> Path:
     cat_y = y_red0 + (RED_BAR_H - cat_h)//2
     draw.text((cat_x, cat_y), categoria, font=cat_font, fill=WHITE_COLOR)
 
-    # caixa branca (título)
+    # título (dentro da caixa branca)
     y_white0 = y_red1
     y_white1 = y_red1 + WHITE_BOX_H
-    draw.rectangle([0, y_white0, W, y_white1], fill=WHITE_COLOR)
-
     title = extract_title_text(post)
     title_box = (WHITE_BOX_MARGIN, y_white0 + WHITE_BOX_MARGIN,
                  W - WHITE_BOX_MARGIN, y_white1 - WHITE_BOX_MARGIN)
@@ -305,37 +631,175 @@ def render_art(post, save_path: Path) -> Path:
         max_lines=TITLE_MAX_LINES, line_spacing=TITLE_LINE_SPACING
     )
     draw_centered_text(draw, wrapped, t_font, title_box, fill=TITLE_COLOR, line_spacing=TITLE_LINE_SPACING)
-
-    # rodapé
-    rod_font = font_roboto_black(RODAPE_SIZE)
-    rod_w = rod_font.getlength("@BOCANOTROMBONELITORAL")
-    ra, rd = rod_font.getmetrics()
-    rod_h = ra + rd
-    rx = (W - int(rod_w))//2
-    ry = RODAPE_Y
-    draw.text((rx, ry), "@BOCANOTROMBONELITORAL", font=rod_font, fill=WHITE_COLOR)
-
-    canvas.save(save_path, "JPEG", quality=92, optimize=True, progressive=True)
-    return save_path
+    return canvas
 
 # ====== VÍDEO ======
-def make_video(jpg: Path, mp4_out: Path, seconds=10):
-    cmd = ["ffmpeg", "-y", "-loop", "1", "-i", str(jpg)]
-    audio = BASE / "audio_fundo.mp3"
-    if audio.exists():
+# Perfis de encode (VIDEO_PROFILE no .env). A arte é uma foto parada: nos
+# perfis "still" a imagem entra a 1 fps e o ffmpeg duplica até 25 fps na
+# saída (IG exige >= 23 fps); os quadros repetidos viram skip no x264.
+# Compare com: python compare_video_profiles.py out/arte_<id>.jpg
+VIDEO_PROFILES = {
+    # comando original: 25 quadros/s decodificados e codificados (medium, crf 23)
+    "legacy":      {"in_fps": None, "x264": [], "faststart": False},
+    "still":       {"in_fps": 1, "x264": ["-preset", "veryfast", "-tune", "stillimage", "-crf", "20", "-g", "250"],
+                    "faststart": True},
+    "still_fast":  {"in_fps": 1, "x264": ["-preset", "ultrafast", "-tune", "stillimage", "-crf", "20", "-g", "250"],
+                    "faststart": True},
+    "still_small": {"in_fps": 1, "x264": ["-preset", "medium", "-tune", "stillimage", "-crf", "26", "-g", "250"],
+                    "faststart": True},
+}
+
+AUDIO_PATH = BASE / "audio_fundo.mp3"
+SEG_DIR    = OUT / "segments"
+SEG_LOCK   = threading.Lock()
+AUDIO_ARGS = ["-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "2"]
+
+def video_cmd(src: Path | None, mp4_out: Path, seconds=10, profile=None,
+              audio: Path | None = None, audio_copy=False, no_audio=False) -> list[str]:
+    """src: arquivo da arte, ou None = um quadro RGB cru (W x H) pelo stdin.
+    audio: faixa de áudio (None = audio_fundo.mp3 se existir); audio_copy=True
+    quando ela já está em AAC (cache) e só precisa ser copiada."""
+    prof = VIDEO_PROFILES[profile or VIDEO_PROFILE]
+    vf = []
+    if src is None:
+        # um único quadro cru; o filtro loop repete até completar a duração
+        fps = prof["in_fps"] or 25
+        cmd = ["ffmpeg", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{W}x{H}",
+               "-framerate", str(fps), "-i", "-"]
+        vf = ["-vf", f"loop=loop={int(seconds * fps) - 1}:size=1:start=0"]
+    else:
+        cmd = ["ffmpeg", "-y", "-loop", "1"]
+        if prof["in_fps"]:
+            cmd += ["-framerate", str(prof["in_fps"])]
+        cmd += ["-i", str(src)]
+    if no_audio:
+        audio = None
+    elif audio is None and AUDIO_PATH.exists():
+        audio = AUDIO_PATH
+    if audio is not None:
         cmd += ["-i", str(audio), "-shortest"]
-    cmd += ["-t", str(seconds), "-r", "25", "-c:v", "libx264", "-pix_fmt", "yuv420p"]
-    if audio.exists():
-        cmd += ["-c:a", "aac", "-b:a", "128k"]
+    cmd += [*vf, "-t", str(seconds), "-r", "25", "-c:v", "libx264", *prof["x264"], "-pix_fmt", "yuv420p"]
+    if audio is not None:
+        cmd += ["-c:a", "copy"] if audio_copy else AUDIO_ARGS
+    elif no_audio:
+        cmd += ["-an"]
+    if prof["faststart"]:
+        cmd += ["-movflags", "+faststart"]
     cmd += [str(mp4_out)]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return cmd
+
+# pool limitado: FFMPEG_WORKERS processos, -threads, nice e timeout por job
+FFMPEG = FFmpegPool(workers=FFMPEG_WORKERS, threads=FFMPEG_THREADS,
+                    timeout=FFMPEG_TIMEOUT, nice=FFMPEG_NICE)
+
+def run_ffmpeg(cmd, input=None):
+    FFMPEG.run(cmd, input=input)
+
+# --- segmentos fixos codificados uma vez (áudio, vinheta de abertura/fim) ---
+def cached_segment(name: str, config: dict, build) -> Path:
+    """Arquivo em out/segments/ por hash da config; build(tmp_path) só na 1ª vez."""
+    key = config_key(Path(name).stem, config)
+    path = SEG_DIR / f"{key}{Path(name).suffix}"
+    with SEG_LOCK:
+        if not path.exists():
+            SEG_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".tmp-{path.name}")
+            build(tmp)
+            os.replace(tmp, path)
+    return path
+
+def audio_track(seconds) -> Path | None:
+    """audio_fundo.mp3 já cortado e em AAC: cada reel só copia o stream."""
+    if not AUDIO_PATH.exists():
+        return None
+    config = {"src": file_fingerprint(AUDIO_PATH), "seconds": seconds, "args": AUDIO_ARGS}
+    return cached_segment("audio.m4a", config, lambda tmp: run_ffmpeg(
+        ["ffmpeg", "-y", "-i", str(AUDIO_PATH), "-t", str(seconds), "-vn", *AUDIO_ARGS, "-f", "mp4", str(tmp)]))
+
+def has_audio_stream(path: Path) -> bool:
+    err = subprocess.run(["ffmpeg", "-hide_banner", "-i", str(path)], capture_output=True, text=True,
+                         timeout=30).stderr
+    return "Audio:" in err
+
+def normalized_segment(src: Path, profile=None) -> Path:
+    """Vinheta (VIDEO_INTRO/VIDEO_OUTRO) recodificada 1x nos mesmos parâmetros
+    do corpo do reel, para o concat por cópia de stream funcionar."""
+    prof_name = profile or VIDEO_PROFILE
+    prof = VIDEO_PROFILES[prof_name]
+    config = {"src": file_fingerprint(src), "size": (W, H), "profile": prof_name, "audio": AUDIO_ARGS}
+
+    def build(tmp):
+        cmd = ["ffmpeg", "-y", "-i", str(src)]
+        if has_audio_stream(src):
+            amap = ["-map", "0:v:0", "-map", "0:a:0"]
+        else:
+            cmd += ["-f", "lavfi", "-i", "anullsrc=channel_layout=stereo:sample_rate=44100"]
+            amap = ["-map", "0:v:0", "-map", "1:a:0", "-shortest"]
+        vf = f"scale={W}:{H}:force_original_aspect_ratio=decrease,pad={W}:{H}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps=25"
+        run_ffmpeg(cmd + [*amap, "-vf", vf, "-c:v", "libx264", *prof["x264"], "-pix_fmt", "yuv420p",
+                          *AUDIO_ARGS, "-f", "mp4", str(tmp)])
+    return cached_segment(f"seg_{Path(src).stem}.mp4", config, build)
+
+def encode_art(art: Path | Image.Image, out: Path, seconds, profile=None, **kw):
+    if isinstance(art, Image.Image):
+        frame = art.convert("RGB")
+        if frame.size != (W, H):
+            frame = frame.resize((W, H), Image.LANCZOS)
+        run_ffmpeg(video_cmd(None, out, seconds, profile, **kw), input=frame.tobytes())
+    else:
+        run_ffmpeg(video_cmd(art, out, seconds, profile, **kw))
+
+def make_video(art: Path | Image.Image, mp4_out: Path, seconds=10, profile=None):
+    """art: caminho da arte ou a própria Image (sem JPEG intermediário).
+    Com VIDEO_SEGMENT_CACHE=1 o que é fixo (áudio, vinhetas) vem pronto do
+    cache e só é copiado. Com VIDEO_CLIP_SECONDS > 0 (opcional), só um clipe
+    curto da imagem parada é codificado e repetido por cópia de stream."""
+    extras = [Path(p) for p in (VIDEO_INTRO, VIDEO_OUTRO) if p]
+    body = mp4_out.with_name(mp4_out.stem + ".body.mp4") if extras else mp4_out
+
+    if not VIDEO_SEGMENT_CACHE:
+        encode_art(art, body, seconds, profile)
+    else:
+        audio = audio_track(seconds)
+        clip_s = VIDEO_CLIP_SECONDS if 0 < VIDEO_CLIP_SECONDS < seconds else 0
+        if not clip_s:
+            encode_art(art, body, seconds, profile, audio=audio, audio_copy=audio is not None)
+        else:
+            # cada clipe começa num IDR, então repetir por cópia gera um H.264 válido
+            clip = mp4_out.with_name(mp4_out.stem + ".clip.mp4")
+            encode_art(art, clip, clip_s, profile, no_audio=True)
+            cmd = ["ffmpeg", "-y", "-stream_loop", str(math.ceil(seconds / clip_s) - 1), "-i", str(clip)]
+            if audio is not None:
+                cmd += ["-i", str(audio), "-map", "0:v", "-map", "1:a", "-shortest"]
+            cmd += ["-c", "copy", "-t", str(seconds), "-movflags", "+faststart", str(body)]
+            try:
+                run_ffmpeg(cmd)
+            finally:
+                clip.unlink(missing_ok=True)
+
+    if extras:
+        # concat demuxer + cópia de stream: nada é recodificado aqui
+        parts = []
+        if VIDEO_INTRO:
+            parts.append(normalized_segment(Path(VIDEO_INTRO), profile))
+        parts.append(body)
+        if VIDEO_OUTRO:
+            parts.append(normalized_segment(Path(VIDEO_OUTRO), profile))
+        lst = mp4_out.with_name(mp4_out.stem + ".concat.txt")
+        lst.write_text("".join(f"file '{p.resolve().as_posix()}'\n" for p in parts), encoding="utf-8")
+        try:
+            run_ffmpeg(["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(lst),
+                        "-c", "copy", "-movflags", "+faststart", str(mp4_out)])
+        finally:
+            lst.unlink(missing_ok=True)
+            body.unlink(missing_ok=True)
     return mp4_out
 
 # ====== FACEBOOK ======
 def fb_publish_video(page_id: str, token: str, file_url: str, description: str) -> str | None:
-    url = f"https://graph.facebook.com/{API_V}/{page_id}/videos"
+    url = f"{GRAPH}/{page_id}/videos"
     data = {"access_token": token, "file_url": file_url, "description": description[:2200]}
-    r = SESSION.post(url, data=data, timeout=120)
+    r = GRAPH_SESSION.post(url, data=data, timeout=120)
     if r.status_code == 200:
         return r.json().get("id")
     log(f"❌ FB /videos falhou: {r.status_code} | {r.text}", "ERROR")
@@ -343,601 +807,447 @@ def fb_publish_video(page_id: str, token: str, file_url: str, description: str)
 
 # ====== INSTAGRAM ======
 def ig_create_container(ig_id: str, token: str, video_url: str, caption: str) -> str | None:
-    url = f"https://graph.facebook.com/{API_V}/{ig_id}/media"
+    url = f"{GRAPH}/{ig_id}/media"
     data = {"access_token": token, "media_type": "REELS", "video_url": video_url, "caption": caption[:2200]}
-    r = SESSION.post(url, data=data, timeout=120)
+    r = GRAPH_SESSION.post(url, data=data, timeout=120)
     if r.status_code == 200:
         return r.json().get("id")
     log(f"❌ IG /media falhou: {r.status_code} | {r.text}", "ERROR")
     return None
 
+def ig_container_status(container_id: str, token: str) -> str | None:
+    url = f"{GRAPH}/{container_id}"
+    r = GRAPH_SESSION.get(url, params={"access_token": token, "fields": "status_code,status"}, timeout=60)
+    if r.status_code == 200:
+        st = r.json().get("status_code")
+        log(f"⏳ IG status {container_id}: {st}", "INFO")
+        return st
+    return None
+
 def ig_wait_finished(container_id: str, token: str, max_wait=480) -> bool:
-    url = f"https://graph.facebook.com/{API_V}/{container_id}"
-    waited = 0
-    while waited <= max_wait:
-        r = SESSION.get(url, params={"access_token": token, "fields": "status_code,status"}, timeout=60)
-        if r.status_code == 200:
-            st = r.json().get("status_code")
-            log(f"⏳ IG status: {st}", "INFO")
-            if st == "FINISHED":
-                return True
-            if st == "ERROR":
-                return False
-        time.sleep(10)
-        waited += 10
+    # versão bloqueante (uso avulso); o loop principal usa IG_POLLER
+    deadline = time.monotonic() + max_wait
+    for delay in backoff_delays(IG_POLL_FIRST, IG_POLL_FACTOR, IG_POLL_MAX):
+        st = ig_container_status(container_id, token)
+        if st == "FINISHED":
+            return True
+        if st == "ERROR":
+            return False
+        left = deadline - time.monotonic()
+        if left <= 0:
+            return False
+        time.sleep(min(delay, left))
     return False
 
 def ig_publish(ig_id: str, token: str, creation_id: str) -> bool:
-    url = f"https://graph.facebook.com/{API_V}/{ig_id}/media_publish"
+    url = f"{GRAPH}/{ig_id}/media_publish"
     data = {"access_token": token, "creation_id": creation_id}
-    r = SESSION.post(url, data=data, timeout=120)
+    r = GRAPH_SESSION.post(url, data=data, timeout=120)
     if r.status_code == 200:
         return True
     log(f"❌ IG /media_publish falhou: {r.status_code} | {r.text}", "ERROR")
     return False
 
-# ====== PROCESSADOS ======
-PROC_FILE = OUT / "processed.json"
-def load_processed():
-    if PROC_FILE.exists():
-        try:
-            return set(json.loads(PROC_FILE.read_text(encoding="utf-8")))
-        except:
-            return set()
-    return set()
-
-def save_processed(s: set):
-    PROC_FILE.write_text(json.dumps(sorted(list(s))), encoding="utf-8")
-
-# ====== LOOP ======
-def process_once():
-    for k, v in [("WP_URL", WP_URL), ("TOKEN", TOKEN), ("PAGE_ID", PAGE_ID), ("IG_ID", IG_ID),
-                 ("CLOUDINARY_CLOUD_NAME", CLOUD_NAME), ("CLOUDINARY_API_KEY", CLOUD_KEY), ("CLOUDINARY_API_SECRET", CLOUD_SEC)]:
-        if not v:
-            log(f"❌ Variável ausente: {k}", "ERROR")
-            return
-
-    posts = wp_latest_posts(limit=5)
-    log(f"→ Recebidos {len(posts)} posts", "INFO")
-
-    processed = load_processed()
-    cloud_ok = cloudinary_init()
-
-    for post in posts:
-        pid = str(post["id"])
-        if pid in processed:
-            continue
-
-        try:
-            log(f"🎨 Arte post {pid}…", "INFO")
-            arte_path = OUT / f"arte_{pid}.jpg"
-            render_art(post, arte_path)
-            log(f"✅ Arte: {arte_path}", "INFO")
-
-            mp4_path = OUT / f"reel_{pid}.mp4"
-            log("🎬 Gerando vídeo 10s…", "INFO")
-            make_video(arte_path, mp4_path, VIDEO_SECONDS)
-            log(f"✅ Vídeo: {mp4_path}", "INFO")
-
-            if not cloud_ok:
-                log("❌ Cloudinary não configurado.", "ERROR")
-                return
-            url_video = cloudinary_upload_video(mp4_path)
-
-            title = extract_title_text(post)
-            link  = post.get("link", "")
-            categoria = pick_category_name(post)
-            caption = f"{title}\n\nCategoria: {categoria}\nLeia mais: {link}\n#BocaNoTrombone #Ilhabela"
-
-            vid_id = fb_publish_video(PAGE_ID, TOKEN, url_video, caption)
-            if vid_id:
-                log(f"📘 Publicado na Página (vídeo): id={vid_id}", "INFO")
-
-            creation = ig_create_container(IG_ID, TOKEN, url_video, caption)
-            if creation:
-                if ig_wait_finished(creation, TOKEN, max_wait=480):
-                    if ig_publish(IG_ID, TOKEN, creation):
-                        log("🎬 IG Reels publicado!", "INFO")
-                    else:
-                        log("⚠️ IG publish falhou mesmo após FINISHED.", "ERROR")
-                else:
-                    log("⚠️ IG não ficou FINISHED a tempo.", "ERROR")
-
-            processed.add(pid)
-            save_processed(processed)
-            time.sleep(2)
-
-        except subprocess.CalledProcessError as e:
-            log(f"❌ FFmpeg falhou: {e}", "ERROR")
-        except requests.RequestException as e:
-            log(f"❌ HTTP falhou: {e}", "ERROR")
-        except Exception as e:
-            log(f"❌ Falha post {pid}: {e}", "ERROR")
-
-def main():
-    log("🚀 Auto Reels (WP→FB+IG) iniciado", "INFO")
-    while True:
-        process_once()
-        log("⏳ Fim do ciclo.", "INFO")
-        time.sleep(SLEEP_BETWEEN_RUNS)
-
-if __name__ == "__main__":
-    main()
-# -*- coding: utf-8 -*-
-"""
-Auto Reels (WP → FB + IG) – FULL
-- Busca posts do WordPress
-- Extrai a 1ª imagem do conteúdo (preferência) ou usa destaque
-- Gera arte no padrão solicitado (logo acima da faixa vermelha, faixa vermelha robusta, título ajusta fonte sem vazar)
-- Adiciona rodapé @BOCANOTROMBONELITORAL
-- Renderiza VÍDEO (9:16, 10s) com áudio opcional (se audio_fundo.mp3 existir)
-- Sobe no Cloudinary (gera URL pública)
-- Publica no Facebook (vídeo) e Instagram (Reels) com espera até FINISHED
-- Guarda IDs processados em out/processed.json
-Requisitos:
-  pip install pillow requests python-dotenv cloudinary beautifulsoup4
-  FFmpeg no PATH
-  .env com: WP_URL, USER_ACCESS_TOKEN, FACEBOOK_PAGE_ID, INSTAGRAM_ID,
-            CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
-Arquivos locais:
-  - logo_boca.png (PNG com transparência)
-  - Anton-Regular.ttf (fonte título)
-  - Roboto-Black.ttf (fonte categoria e rodapé)
-  - audio_fundo.mp3 (opcional)
-"""
-
-import os, io, time, json, math, subprocess, textwrap, datetime
-from pathlib import Path
-import requests
-from bs4 import BeautifulSoup
-from PIL import Image, ImageDraw, ImageFont, ImageOps
-from dotenv import load_dotenv
-
-# ====== CONFIG BÁSICA ======
-load_dotenv()
-WP_URL      = os.getenv("WP_URL", "").rstrip("/")
-TOKEN       = os.getenv("USER_ACCESS_TOKEN", "")
-PAGE_ID     = os.getenv("FACEBOOK_PAGE_ID", "")
-IG_ID       = os.getenv("INSTAGRAM_ID", "")
-API_V       = os.getenv("API_VERSION", "v23.0")
-
-CLOUD_NAME  = os.getenv("CLOUDINARY_CLOUD_NAME", "")
-CLOUD_KEY   = os.getenv("CLOUDINARY_API_KEY", "")
-CLOUD_SEC   = os.getenv("CLOUDINARY_API_SECRET", "")
-
-BASE = Path(__file__).parent
-OUT  = BASE / "out"
-OUT.mkdir(exist_ok=True)
-
-# ====== AJUSTES VISUAIS – (você pode mexer SÓ AQUI) ======
-W, H                 = 1080, 1920               # vídeo/arte 9:16
-TOP_IMAGE_H          = int(H * 0.50)            # altura da imagem de topo
-LOGO_PATH            = BASE / "logo_boca.png"   # seu logo (PNG)
-LOGO_MAX_W           = 300                      # largura máx do logo
-LOGO_Y_FROM_TOPIMG   = TOP_IMAGE_H - 90         # Y do logo (fica acima da faixa vermelha)
-RED_BAR_H            = 260                      # altura da faixa vermelha (categoria) – “mais robusta”
-CATEGORY_TXT_SIZE    = 58                       # fonte base da categoria (vai em branco)
-CATEGORY_TXT_MARGINX = 36                       # margem horizontal dentro da faixa vermelha
-
-WHITE_BOX_Y          = TOP_IMAGE_H + RED_BAR_H  # começa logo após faixa vermelha
-WHITE_BOX_H          = 520                      # altura da caixa branca (texto)
-WHITE_BOX_MARGIN     = 36                       # margem interna da caixa branca
-
-TITLE_MAX_FONTSIZE   = 64                       # teto da fonte do título (Anton)
-TITLE_MIN_FONTSIZE   = 42                       # piso para não ficar pequeno
-TITLE_LINE_SPACING   = 1.05                     # espaçamento entre linhas
-TITLE_MAX_LINES      = 6                        # limite de linhas
-TITLE_COLOR          = (0, 0, 0)
-
-RODAPE_TXT           = "@BOCANOTROMBONELITORAL" # rodapé
-RODAPE_SIZE          = 42                       # tamanho da fonte do rodapé
-RODAPE_Y             = H - 120                  # posição Y do rodapé
-
-BG_FILL_COLOR        = (0, 0, 0)                # cor de fundo
-RED_COLOR            = (229, 0, 0)              # vermelho da faixa
-WHITE_COLOR          = (255, 255, 255)
-
-FONT_ANTON_PATH      = BASE / "Anton-Regular.ttf"
-FONT_ROBOTO_PATH     = BASE / "Roboto-Black.ttf"
-
-VIDEO_SECONDS        = 10                       # duração do vídeo
-SLEEP_BETWEEN_RUNS   = 300                      # loop: espera 5 min entre ciclos
-
-# ====== LOG SIMPLES ======
-def log(msg, level="INFO"):
-    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"{ts} | {level} | {msg}", flush=True)
-
-# ====== SESSÃO HTTP COM RETRY ======
-SESSION = requests.Session()
-ADAPTER = requests.adapters.HTTPAdapter(max_retries=3)
-SESSION.mount("http://", ADAPTER)
-SESSION.mount("https://", ADAPTER)
-SESSION.headers.update({"User-Agent": "AutoReelsBot/1.0"})
-
-# ====== CLOUDINARY ======
-def cloudinary_init():
-    if not (CLOUD_NAME and CLOUD_KEY and CLOUD_SEC):
-        return False
+# ====== JOBS (SQLite, checkpoints por estágio) ======
+PROC_FILE = OUT / "processed.json"                # legado: importado na 1ª execução
+IDS_FILE  = BASE / "processed_post_ids.txt"       # legado: importado na 1ª execução
+JOBS_DB   = OUT / "jobs.sqlite3"
+PROC_LOCK = threading.Lock()
+INFLIGHT  = set()  # posts no pipeline ou esperando o IG (não reenfileirar)
+
+STORE = None
+STORE_LOCK = threading.Lock()
+def get_store() -> JobStore:
+    global STORE
+    with STORE_LOCK:   # webhook e loop podem chegar juntos na 1ª vez
+        if STORE is None:
+            store = JobStore(JOBS_DB)
+            n = store.import_legacy(PROC_FILE, IDS_FILE)
+            if n:
+                log(f"📥 Importados {n} IDs processados (legado) para {JOBS_DB.name}", "INFO")
+            STORE = store
+    return STORE
+
+def mark_processed(pid: str):
+    get_store().mark_done(pid)
+    release_inflight(pid)
+
+def release_inflight(pid: str):
+    with PROC_LOCK:
+        INFLIGHT.discard(pid)
+        UPLOAD_LOCKS.pop(pid, None)
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _exists(p) -> bool:
+    return bool(p) and Path(p).exists()
+
+def _mp4_ok(job) -> bool:
+    return _exists(job.get("mp4_path")) and job.get("mp4_sha256") == file_sha256(job["mp4_path"])
+
+# ====== ESTÁGIOS DO PIPELINE ======
+# cada estágio pula se o checkpoint dele já estiver no JobStore
+
+ART_SAVER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arte-jpg")
+
+def save_art_preview(pid: str, canvas: Image.Image):
+    # prévia arte_{pid}.jpg fora do caminho crítico (SAVE_ART_JPEG=1)
+    path = OUT / f"arte_{pid}.jpg"
     try:
-        import cloudinary
-        cloudinary.config(
-            cloud_name=CLOUD_NAME,
-            api_key=CLOUD_KEY,
-            api_secret=CLOUD_SEC,
-            secure=True
-        )
-        return True
+        canvas.save(path, "JPEG", quality=92, optimize=True, progressive=True)
+        get_store().update(pid, arte_path=str(path))
     except Exception as e:
-        log(f"Cloudinary init falhou: {e}", "ERROR")
-        return False
-
-def cloudinary_upload_video(path: Path) -> str:
-    import cloudinary.uploader
-    res = cloudinary.uploader.upload_large(
-        str(path),
-        resource_type="video",
-        timeout=600,
-        folder="auto_reels",
-        overwrite=True
-    )
-    return res["secure_url"]
-
-# ====== WP FETCH ======
-def wp_latest_posts(limit=5):
-    url = f"{WP_URL}/wp-json/wp/v2/posts?per_page={limit}&orderby=date&_fields=id,title,excerpt,featured_media,content,link,categories"
-    r = SESSION.get(url, timeout=30)
-    r.raise_for_status()
-    return r.json()
-
-def pick_category_name(post):
-    # tenta extrair alguma categoria textual do título/emoji; senão "Notícias"
-    t = post.get("title", {}).get("rendered", "") or ""
-    # se vier prefixos como "🚨", "‼️", etc, você pode mapear aqui:
-    if "Polícia" in t or "🚔" in t or "🚨" in t:
-        return "POLÍCIA"
-    if "Pronto Falei" in t or "‼️" in t:
-        return "PRONTO FALEI"
-    return "NOTÍCIAS"
-
-def extract_title_text(post) -> str:
-    from html import unescape
-    raw = post.get("title", {}).get("rendered", "") or ""
-    # tira HTML simples
-    soup = BeautifulSoup(raw, "html.parser")
-    txt = soup.get_text(" ", strip=True)
-    return unescape(txt)
-
-def find_first_image_in_content(post) -> str | None:
-    html = post.get("content", {}).get("rendered", "") or ""
-    soup = BeautifulSoup(html, "html.parser")
-    img = soup.find("img")
-    if img and img.get("src"):
-        return img["src"]
-    return None
-
-def download_image_rgb(url: str) -> Image.Image | None:
-    try:
-        r = SESSION.get(url, timeout=30)
-        r.raise_for_status()
-        img = Image.open(io.BytesIO(r.content))
-        if img.mode not in ("RGB", "RGBA"):
-            img = img.convert("RGB")
+        log(f"⚠️  Não salvei a prévia {path.name}: {e}", "INFO")
+
+def stage_render(job):
+    pid = job["pid"]
+    if job.get("cloud_url") or _exists(job.get("arte_path")) or _mp4_ok(job):
+        return job
+    log(f"🎨 Arte post {pid}…", "INFO")
+    with METRICS.span("render_art", pid):
+        job["canvas"] = render_art_image(job["post"])
+    if SAVE_ART_JPEG:
+        ART_SAVER.submit(save_art_preview, pid, job["canvas"])
+    log(f"✅ Arte post {pid}", "INFO")
+    return job
+
+def stage_encode(job):
+    pid = job["pid"]
+    if job.get("cloud_url"):
+        return job
+    if _mp4_ok(job):
+        log(f"♻️  Vídeo já pronto (post {pid})", "INFO")
+        return job
+    log(f"🎬 Gerando vídeo 10s… (post {pid})", "INFO")
+    # canvas em memória vai cru pelo stdin; retomada sem canvas usa o JPG salvo
+    art = job.pop("canvas", None)
+    if art is None:
+        art = Path(job["arte_path"])
+    with METRICS.span("make_video", pid, profile=VIDEO_PROFILE) as sp:
+        mp4 = make_video(art, OUT / f"reel_{pid}.mp4", VIDEO_SECONDS)
+        sp.set(bytes=mp4.stat().st_size)
+    job["mp4_path"], job["mp4_sha256"] = str(mp4), file_sha256(mp4)
+    get_store().update(pid, mp4_path=job["mp4_path"], mp4_sha256=job["mp4_sha256"])
+    log(f"✅ Vídeo: {mp4}", "INFO")
+    return job
+
+UPLOAD_LOCKS = {}   # pid -> Lock: FB e IG em reserva não sobem o mesmo mp4 duas vezes
+
+def ensure_cloud_url(job) -> str:
+    with PROC_LOCK:
+        lock = UPLOAD_LOCKS.setdefault(job["pid"], threading.Lock())
+    with lock:
+        if job.get("cloud_url"):
+            return job["cloud_url"]
+        mp4, store = Path(job["mp4_path"]), get_store()
+        sha = job.get("mp4_sha256") or file_sha256(mp4)
+        url = store.upload_url(sha)
+        if url:
+            log(f"♻️  Cloudinary: mp4 idêntico já enviado (post {job['pid']}), sem novo upload", "INFO")
         else:
-            img = img.convert("RGB")
-        return img
-    except Exception as e:
-        log(f"⚠️  Não baixei imagem: {e}", "INFO")
+            with METRICS.span("cloudinary_upload_video", job["pid"], bytes=mp4.stat().st_size):
+                url = cloudinary_upload_video(mp4, public_id=f"reel_{sha[:32]}")
+            store.save_upload(sha, url)
+            log(f"☁️  Cloudinary post {job['pid']}: {url}", "INFO")
+        job["cloud_url"] = url
+        store.update(job["pid"], cloud_url=url)
+    return url
+
+def stage_upload(job):
+    if UPLOAD_TRANSPORT != "graph":
+        ensure_cloud_url(job)
+    return job   # modo graph: o mp4 sobe direto no estágio de publicação
+
+def stage_publish(job):
+    pid = job["pid"]
+    if job.get("ig_published"):
+        mark_processed(pid)
         return None
-
-def object_fit_cover(src: Image.Image, box_w: int, box_h: int) -> Image.Image:
-    # recorte tipo CSS object-fit: cover mantendo centro
-    sw, sh = src.size
-    scale = max(box_w / sw, box_h / sh)
-    nw, nh = int(sw * scale), int(sh * scale)
-    img = src.resize((nw, nh), Image.LANCZOS)
-    x = (nw - box_w) // 2
-    y = (nh - box_h) // 2
-    return img.crop((x, y, x + box_w, y + box_h))
-
-# ====== TIPOGRAFIA ======
-def load_font(path: Path, size: int, fallback="DejaVuSans.ttf"):
-    try:
-        return ImageFont.truetype(str(path), size=size, layout_engine=ImageFont.LAYOUT_RAQM)
-    except:
-        return ImageFont.truetype(fallback, size=size)
-
-def draw_centered_text(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont, box, fill=(255,255,255), line_spacing=1.0):
-    x0, y0, x1, y1 = box
-    w_box = x1 - x0
-    h_box = y1 - y0
-    lines = text.split("\n")
-    # calcula altura total
-    line_h = font.getbbox("Ay")[3] - font.getbbox("Ay")[1]
-    total_h = int(sum((line_h * line_spacing) for _ in lines))
-    y = y0 + (h_box - total_h) // 2
-    for line in lines:
-        tw = font.getlength(line)
-        tx = x0 + (w_box - int(tw)) // 2
-        draw.text((tx, y), line, font=font, fill=fill)
-        y += int(line_h * line_spacing)
-
-def fit_title_in_box(draw, text, font_path, box, max_size, min_size, max_lines, line_spacing=1.05):
-    x0, y0, x1, y1 = box
-    Wb, Hb = x1 - x0, y1 - y0
-    # tenta do maior pro menor
-    for size in range(max_size, min_size - 1, -2):
-        font = load_font(font_path, size)
-        # tenta quebrar em linhas que caibam na largura
-        wrapped = []
-        for paragraph in text.split("\n"):
-            # quebra por largura
-            words = paragraph.strip().split()
-            if not words:
-                wrapped.append("")
-                continue
-            line = words[0]
-            for w in words[1:]:
-                if font.getlength(line + " " + w) <= (Wb - 2):
-                    line += " " + w
-                else:
-                    wrapped.append(line)
-                    line = w
-            wrapped.append(line)
-        # corta se exceder max_lines
-        if len(wrapped) > max_lines:
-            wrapped = wrapped[:max_lines-1] + [wrapped[max_lines-1] + "…"]
-        # mede altura total
-        line_h = font.getbbox("Ay")[3] - font.getbbox("Ay")[1]
-        total_h = int(len(wrapped) * line_h * line_spacing)
-        if total_h <= Hb:
-            return font, "\n".join(wrapped)
-    # fallback
-    return load_font(font_path, min_size), textwrap.shorten(text, width=120, placeholder="…")
-
-# ====== ARTE ======
-def render_art(post, save_path: Path) -> Path:
-    # base
-    canvas = Image.new("RGB", (W, H), BG_FILL_COLOR)
-    draw = ImageDraw.Draw(canvas)
-
-    # imagem topo (cover)
-    img_url = find_first_image_in_content(post)
-    if img_url:
-        bg = download_image_rgb(img_url)
+    post = job["post"]
+    title = extract_title_text(post)
+    link  = post.get("link", "")
+    categoria = pick_category_name(post)
+    caption = f"{title}\n\nCategoria: {categoria}\nLeia mais: {link}\n#BocaNoTrombone #Ilhabela"
+
+    # FB e IG não dependem um do outro: os dois partem da mesma URL ao mesmo
+    # tempo, e um /videos lento do FB não atrasa o processamento do IG
+    fb = None if job.get("fb_video_id") else PUBLISHER.submit(publish_fb, job, caption)
+    ig = None if job.get("ig_container_id") else PUBLISHER.submit(create_ig, job, caption)
+    fb_throttled = None
+    if fb:
+        try:
+            fb.result()
+        except GraphThrottled as e:
+            fb_throttled = e   # não perde o FB: o job volta pra fila depois do IG
+        except Exception as e:
+            get_store().update(pid, fb_error=str(e)[:1000])
+            log(f"❌ FB falhou (post {pid}), segue com o IG: {e}", "ERROR")
+    creation = ig.result() if ig else job["ig_container_id"]   # erro do IG: job volta pra fila
+    if fb_throttled:
+        raise fb_throttled   # container (se criado) está salvo e é retomado na próxima vez
+    if creation:
+        # não espera aqui: o poller publica assim que ficar FINISHED
+        job.setdefault("ig_wait_t0", time.monotonic())
+        get_ig_poller().add(creation, job)
     else:
-        bg = None
+        mark_processed(pid)
+    return None
 
-    if bg is None:
-        # fundo liso se faltar
-        top = Image.new("RGB", (W, TOP_IMAGE_H), (20,20,20))
+PUBLISHER = ThreadPoolExecutor(max_workers=2 * PIPE_PUBLISH_WORKERS, thread_name_prefix="publish")
+
+def upload_progress(pid):
+    def report(platform, sent, total):
+        log(f"⬆️  {platform.upper()} post {pid}: {sent / 1e6:.1f}/{total / 1e6:.1f} MB", "INFO")
+    return report
+
+def direct_upload(job, platform, upload, *args, **kw):
+    """Upload direto retomável; o progresso vai para jobs.{fb,ig}_upload a cada pedaço."""
+    pid, field = job["pid"], f"{platform}_upload"
+    state = json.loads(job.get(field) or "{}")
+    def save(st):
+        job[field] = json.dumps(st)
+        get_store().update(pid, **{field: job[field]})
+    return upload(*args, state=state, save=save, progress=upload_progress(pid),
+                  on_retry=METRICS.note_retry, **kw)
+
+def publish_fb(job, caption):
+    pid, vid_id = job["pid"], None
+    if UPLOAD_TRANSPORT == "graph":
+        try:
+            with METRICS.span("fb_publish_video", pid, transport="graph",
+                              bytes=Path(job["mp4_path"]).stat().st_size):
+                vid_id = direct_upload(job, "fb", fb_chunked_upload, GRAPH_SESSION, GRAPH, PAGE_ID,
+                                       TOKEN, Path(job["mp4_path"]), caption)
+        except GraphThrottled:
+            raise   # limite: o Cloudinary cairia no mesmo limite logo depois
+        except Exception as e:
+            log(f"⚠️  Upload direto FB falhou (post {pid}), usando Cloudinary: {e}", "ERROR")
+    if not vid_id:
+        url_video = ensure_cloud_url(job)
+        with METRICS.span("fb_publish_video", pid, transport="url"):
+            vid_id = fb_publish_video(PAGE_ID, TOKEN, url_video, caption)
+    if vid_id:
+        get_store().update(pid, fb_video_id=vid_id, fb_error=None)
+        log(f"📘 Publicado na Página (vídeo): id={vid_id}", "INFO")
     else:
-        top = object_fit_cover(bg, W, TOP_IMAGE_H)
-    canvas.paste(top, (0, 0))
+        get_store().update(pid, fb_error="FB /videos sem id")
+    return vid_id
 
-    # LOGO (acima da faixa vermelha)
-    if LOGO_PATH.exists():
+def create_ig(job, caption):
+    pid, creation = job["pid"], None
+    if UPLOAD_TRANSPORT == "graph":
         try:
-            logo = Image.open(LOGO_PATH).convert("RGBA")
-            # escala
-            w_ratio = min(LOGO_MAX_W / logo.width, 1.0)
-            new_w = int(logo.width * w_ratio)
-            new_h = int(logo.height * w_ratio)
-            logo = logo.resize((new_w, new_h), Image.LANCZOS)
-            lx = (W - new_w)//2
-            ly = max(0, LOGO_Y_FROM_TOPIMG - new_h)  # garante que fica no topo da imagem
-            canvas.paste(logo, (lx, ly), logo)
+            with METRICS.span("ig_create_container", pid, transport="graph",
+                              bytes=Path(job["mp4_path"]).stat().st_size):
+                creation = direct_upload(job, "ig", ig_resumable_upload, GRAPH_SESSION, GRAPH,
+                                         RUPLOAD_URL, API_V, IG_ID, TOKEN, Path(job["mp4_path"]),
+                                         caption, chunk_size=int(UPLOAD_CHUNK_MB * (1 << 20)))
+        except GraphThrottled:
+            get_store().update(pid, ig_error="limite da Graph")
+            raise
         except Exception as e:
-            log(f"⚠️  Erro ao aplicar logo: {e}", "INFO")
-
-    # FAIXA VERMELHA (categoria)
-    y_red0 = TOP_IMAGE_H
-    y_red1 = TOP_IMAGE_H + RED_BAR_H
-    draw.rectangle([0, y_red0, W, y_red1], fill=RED_COLOR)
-
-    categoria = pick_category_name(post)
-    cat_font = load_font(FONT_ROBOTO_PATH, CATEGORY_TXT_SIZE)
-    cat_w = cat_font.getlength(categoria.upper())
-    cat_h = cat_font.getbbox("Ay")[3] - cat_font.getbbox("Ay")[1]
-    cat_x = (W - int(cat_w))//2
-    cat_y = y_red0 + (RED_BAR_H - cat_h)//2
-    draw.text((cat_x, cat_y), categoria.upper(), font=cat_font, fill=WHITE_COLOR)
-
-    # CAIXA BRANCA (título)
-    y_white0 = WHITE_BOX_Y
-    y_white1 = WHITE_BOX_Y + WHITE_BOX_H
-    draw.rectangle([0, y_white0, W, y_white1], fill=WHITE_COLOR)
-
-    title = extract_title_text(post)
-    title_box = (WHITE_BOX_MARGIN,
-                 y_white0 + WHITE_BOX_MARGIN,
-                 W - WHITE_BOX_MARGIN,
-                 y_white1 - WHITE_BOX_MARGIN)
-
-    title_font, wrapped = fit_title_in_box(
-        draw, title, FONT_ANTON_PATH, title_box,
-        max_size=TITLE_MAX_FONTSIZE,
-        min_size=TITLE_MIN_FONTSIZE,
-        max_lines=TITLE_MAX_LINES,
-        line_spacing=TITLE_LINE_SPACING
-    )
-    draw_centered_text(draw, wrapped, title_font, title_box, fill=TITLE_COLOR, line_spacing=TITLE_LINE_SPACING)
-
-    # RODAPÉ
-    rod_font = load_font(FONT_ROBOTO_PATH, RODAPE_SIZE)
-    rod_w = rod_font.getlength(RODAPE_TXT)
-    rod_h = rod_font.getbbox("Ay")[3] - rod_font.getbbox("Ay")[1]
-    rx = (W - int(rod_w))//2
-    ry = RODAPE_Y
-    draw.text((rx, ry), RODAPE_TXT, font=rod_font, fill=WHITE_COLOR)
-
-    canvas.save(save_path, "JPEG", quality=92, optimize=True, progressive=True)
-    return save_path
-
-# ====== VÍDEO (FFMPEG) ======
-def make_video(jpg: Path, mp4_out: Path, seconds=10):
-    cmd = [
-        "ffmpeg", "-y",
-        "-loop", "1", "-i", str(jpg)
-    ]
-    audio = BASE / "audio_fundo.mp3"
-    if audio.exists():
-        cmd += ["-i", str(audio), "-shortest"]
-    cmd += [
-        "-t", str(seconds),
-        "-r", "25",
-        "-c:v", "libx264", "-pix_fmt", "yuv420p"
-    ]
-    if audio.exists():
-        cmd += ["-c:a", "aac", "-b:a", "128k"]
-    cmd += [str(mp4_out)]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return mp4_out
-
-# ====== FACEBOOK PAGE (VÍDEO) ======
-def fb_publish_video(page_id: str, token: str, file_url: str, description: str) -> str | None:
-    url = f"https://graph.facebook.com/{API_V}/{page_id}/videos"
-    data = {
-        "access_token": token,
-        "file_url": file_url,
-        "description": description[:2200]
-    }
-    r = SESSION.post(url, data=data, timeout=120)
-    if r.status_code == 200:
-        return r.json().get("id")
-    log(f"❌ FB /videos falhou: {r.status_code} | {r.text}", "ERROR")
-    return None
-
-# ====== INSTAGRAM (REELS) ======
-def ig_create_container(ig_id: str, token: str, video_url: str, caption: str) -> str | None:
-    url = f"https://graph.facebook.com/{API_V}/{ig_id}/media"
-    data = {
-        "access_token": token,
-        "media_type": "REELS",
-        "video_url": video_url,
-        "caption": caption[:2200]
-    }
-    r = SESSION.post(url, data=data, timeout=120)
-    if r.status_code == 200:
-        return r.json().get("id")
-    log(f"❌ IG /media falhou: {r.status_code} | {r.text}", "ERROR")
-    return None
-
-def ig_wait_finished(container_id: str, token: str, max_wait=300) -> bool:
-    url = f"https://graph.facebook.com/{API_V}/{container_id}"
-    waited = 0
-    while waited <= max_wait:
-        r = SESSION.get(url, params={"access_token": token, "fields": "status_code,status"}, timeout=60)
-        if r.status_code == 200:
-            st = r.json().get("status_code")
-            log(f"⏳ IG status: {st}", "INFO")
-            if st == "FINISHED":
-                return True
-            if st == "ERROR":
-                return False
-        time.sleep(10)
-        waited += 10
-    return False
-
-def ig_publish(ig_id: str, token: str, creation_id: str) -> bool:
-    url = f"https://graph.facebook.com/{API_V}/{ig_id}/media_publish"
-    data = {"access_token": token, "creation_id": creation_id}
-    r = SESSION.post(url, data=data, timeout=120)
-    if r.status_code == 200:
-        return True
-    log(f"❌ IG /media_publish falhou: {r.status_code} | {r.text}", "ERROR")
-    return False
-
-# ====== PROCESSADOS ======
-PROC_FILE = OUT / "processed.json"
-def load_processed():
-    if PROC_FILE.exists():
+            log(f"⚠️  Upload direto IG falhou (post {pid}), usando Cloudinary: {e}", "ERROR")
+    try:
+        if not creation:
+            url_video = ensure_cloud_url(job)
+            with METRICS.span("ig_create_container", pid, transport="url"):
+                creation = ig_create_container(IG_ID, TOKEN, url_video, caption)
+    except Exception as e:
+        get_store().update(pid, ig_error=str(e)[:1000])
+        raise
+    if creation:
+        get_store().update(pid, ig_container_id=creation, ig_error=None)
+        log(f"📦 IG container criado: {creation} (post {pid})", "INFO")
+    else:
+        get_store().update(pid, ig_error="IG /media sem id")
+    return creation
+
+IG_CHECKS = {}   # container -> checagens de status feitas (vira "retries" do ig_wait_finished)
+
+def ig_poll_status(creation):
+    with PROC_LOCK:
+        IG_CHECKS[creation] = IG_CHECKS.get(creation, 0) + 1
+    return ig_container_status(creation, TOKEN)
+
+def ig_on_container_done(creation, job, ok):
+    with PROC_LOCK:
+        checks = IG_CHECKS.pop(creation, 0)
+    wait = Span("ig_wait_finished", job["pid"], container=creation)
+    wait.retries = max(0, checks - 1)
+    METRICS.record(wait, time.monotonic() - job.pop("ig_wait_t0", time.monotonic()),
+                   "ok" if ok else "timeout")
+    if ok:
         try:
-            return set(json.loads(PROC_FILE.read_text(encoding="utf-8")))
-        except:
-            return set()
-    return set()
+            with METRICS.span("ig_publish", job["pid"]):
+                published = ig_publish(IG_ID, TOKEN, creation)
+        except Exception as e:
+            # container pronto continua válido: o job volta e republica pelo ig_container_id
+            release_inflight(job["pid"])
+            get_store().fail(job["pid"], f"publish: {e}")
+            if isinstance(e, GraphThrottled):
+                log(f"🚦 IG publish adiado pelo limite da Graph (post {job['pid']}): {e}", "ERROR")
+            else:
+                log(f"❌ IG publish falhou (post {job['pid']}), tenta no próximo ciclo: {e}", "ERROR")
+            return
+        if published:
+            get_store().update(job["pid"], ig_published=1)
+            log(f"🎬 IG Reels publicado! (post {job['pid']})", "INFO")
+        else:
+            log("⚠️ IG publish falhou mesmo após FINISHED.", "ERROR")
+    else:
+        log(f"⚠️ IG não ficou FINISHED a tempo. (post {job['pid']})", "ERROR")
+    mark_processed(job["pid"])
+
+IG_POLLER = None
+def get_ig_poller() -> ContainerPoller:
+    global IG_POLLER
+    if IG_POLLER is None:
+        IG_POLLER = ContainerPoller(
+            ig_poll_status, ig_on_container_done,
+            max_wait=IG_POLL_MAX_WAIT, first_delay=IG_POLL_FIRST,
+            factor=IG_POLL_FACTOR, max_delay=IG_POLL_MAX, log=log,
+        ).start()
+    return IG_POLLER
+
+def stage_error(stage, job, e):
+    pid = job["pid"]
+    release_inflight(pid)
+    get_store().fail(pid, f"{stage}: {e}")
+    if isinstance(e, subprocess.CalledProcessError):
+        log(f"❌ FFmpeg falhou: {e}", "ERROR")
+    elif isinstance(e, subprocess.TimeoutExpired):
+        log(f"❌ FFmpeg travou (post {pid}): {e}", "ERROR")
+    elif isinstance(e, requests.RequestException):
+        log(f"❌ HTTP falhou: {e}", "ERROR")
+    else:
+        log(f"❌ Falha post {pid} ({stage}): {e}", "ERROR")
 
-def save_processed(s: set):
-    PROC_FILE.write_text(json.dumps(sorted(list(s))), encoding="utf-8")
+def build_pipeline() -> Pipeline:
+    return Pipeline([
+        Stage("render",  stage_render,  PIPE_RENDER_WORKERS),
+        Stage("encode",  stage_encode,  PIPE_ENCODE_WORKERS),
+        Stage("upload",  stage_upload,  PIPE_UPLOAD_WORKERS),
+        Stage("publish", stage_publish, PIPE_PUBLISH_WORKERS),
+    ], queue_size=PIPE_QUEUE_SIZE, on_error=stage_error)
 
-# ====== LOOP PRINCIPAL ======
-def process_once():
-    # valida env
+# ====== LOOP ======
+def check_config() -> bool:
     for k, v in [("WP_URL", WP_URL), ("TOKEN", TOKEN), ("PAGE_ID", PAGE_ID), ("IG_ID", IG_ID),
                  ("CLOUDINARY_CLOUD_NAME", CLOUD_NAME), ("CLOUDINARY_API_KEY", CLOUD_KEY), ("CLOUDINARY_API_SECRET", CLOUD_SEC)]:
-        if not v:
+        if not v and not (UPLOAD_TRANSPORT == "graph" and k.startswith("CLOUDINARY")):
             log(f"❌ Variável ausente: {k}", "ERROR")
-            return
-
-    posts = wp_latest_posts(limit=5)
-    log(f"→ Recebidos {len(posts)} posts", "INFO")
+            return False
+
+    get_ig_poller()
+    if not cloudinary_init():
+        if UPLOAD_TRANSPORT != "graph":
+            log("❌ Cloudinary não configurado.", "ERROR")
+            return False
+        log("⚠️  Cloudinary não configurado: upload direto sem reserva.", "INFO")
+    return True
+
+def process_once() -> dict | None:
+    """Um ciclo; devolve {"posts": n, "backlog": bool} (None se não rodou)."""
+    if not check_config():
+        return None
 
-    processed = load_processed()
-    cloud_ok = cloudinary_init()
+    store = get_store()
+    posts = wp_new_posts(limit=5)
+    log(f"→ Recebidos {len(posts)} posts novos", "INFO")
+    get_poll_scheduler().observe(posts)
 
+    # retoma jobs inacabados (crash/falha) no 1º estágio que faltou
+    jobs = {j["pid"]: j for j in store.unfinished(JOB_MAX_ATTEMPTS)}
+    resumed = [pid for pid in jobs if pid not in INFLIGHT]
+    if resumed:
+        log(f"↻ Retomando {len(resumed)} post(s) inacabados: {', '.join(resumed)}", "INFO")
     for post in posts:
-        pid = post["id"]
-        if str(pid) in processed:
-            continue
-
-        try:
-            log(f"🎨 Arte post {pid}…", "INFO")
-            arte_path = OUT / f"arte_{pid}.jpg"
-            render_art(post, arte_path)
-            log(f"✅ Arte: {arte_path}", "INFO")
-
-            mp4_path = OUT / f"reel_{pid}.mp4"
-            log("🎬 Gerando vídeo 10s…", "INFO")
-            make_video(arte_path, mp4_path, VIDEO_SECONDS)
-            log(f"✅ Vídeo: {mp4_path}", "INFO")
-
-            # sobe pro cloudinary
-            if not cloud_ok:
-                log("❌ Cloudinary não configurado.", "ERROR")
-                return
-            url_video = cloudinary_upload_video(mp4_path)
-
-            # capção básica
-            title = extract_title_text(post)
-            link  = post.get("link", "")
-            categoria = pick_category_name(post)
-            caption = f"{title}\n\nCategoria: {categoria}\nLeia mais: {link}\n#BocaNoTrombone #Ilhabela"
-
-            # 1) Facebook Page /videos
-            vid_id = fb_publish_video(PAGE_ID, TOKEN, url_video, caption)
-            if vid_id:
-                log(f"📘 Publicado na Página (vídeo): id={vid_id}", "INFO")
-
-            # 2) Instagram Reels com espera
-            creation = ig_create_container(IG_ID, TOKEN, url_video, caption)
-            if creation:
-                if ig_wait_finished(creation, TOKEN, max_wait=480):
-                    if ig_publish(IG_ID, TOKEN, creation):
-                        log("🎬 IG Reels publicado!", "INFO")
-                    else:
-                        log("⚠️ IG publish falhou mesmo após FINISHED.", "ERROR")
-                else:
-                    log("⚠️ IG não ficou FINISHED a tempo.", "ERROR")
-
-            processed.add(str(pid))
-            save_processed(processed)
-            time.sleep(2)
-
-        except subprocess.CalledProcessError as e:
-            log(f"❌ FFmpeg falhou: {e}", "ERROR")
-        except requests.RequestException as e:
-            log(f"❌ HTTP falhou: {e}", "ERROR")
-        except Exception as e:
-            log(f"❌ Falha post {pid}: {e}", "ERROR")
+        pid = str(post["id"])
+        if not store.is_done(pid):
+            jobs[pid] = store.begin(pid, post)
+
+    with build_pipeline() as pipe:
+        for pid, job in jobs.items():
+            with PROC_LOCK:
+                if pid in INFLIGHT:
+                    continue
+                INFLIGHT.add(pid)
+            pipe.submit(job)
+    return {"posts": len(posts), "backlog": WP_MORE}
+
+# ---- push: webhook -> pipeline permanente (o ciclo de polling tem o seu) ----
+PUSH_PIPELINE = None
+def get_push_pipeline() -> Pipeline:
+    global PUSH_PIPELINE
+    with PROC_LOCK:
+        if PUSH_PIPELINE is None:
+            PUSH_PIPELINE = build_pipeline().start()
+        return PUSH_PIPELINE
+
+def enqueue_post(pid: str) -> bool:
+    """Post avisado pelo webhook: busca no WP e entra direto no pipeline.
+    O job é chaveado pelo id que o WP devolve (o mesmo do polling)."""
+    if not str(pid).isdigit():
+        raise ValueError(f"id de post inválido: {pid!r}")
+    pid = str(int(pid))   # '0123' e '123' são o mesmo post
+    store = get_store()
+    if store.is_done(pid):
+        log(f"↩️  Webhook post {pid}: já processado", "INFO")
+        return False
+    with PROC_LOCK:
+        if pid in INFLIGHT:
+            log(f"↩️  Webhook post {pid}: já em andamento", "INFO")
+            return False
+        INFLIGHT.add(pid)
+    try:
+        if not check_config():
+            raise RuntimeError("configuração incompleta")
+        post = wp_get_post(pid)
+        if str(post.get("id")) != pid:
+            raise RuntimeError(f"WP devolveu o post {post.get('id')} para o id {pid}")
+        job = store.begin(str(post["id"]), post)
+    except Exception:
+        release_inflight(pid)
+        raise
+    log(f"📨 Webhook: post {pid} direto no pipeline", "INFO")
+    get_push_pipeline().submit(job)
+    return True
+
+POLL_SCHEDULER = None
+def get_poll_scheduler() -> PollScheduler:
+    global POLL_SCHEDULER
+    if POLL_SCHEDULER is None:
+        POLL_SCHEDULER = PollScheduler(OUT / "poll_stats.json", base_s=SLEEP_BETWEEN_RUNS,
+                                       min_s=POLL_MIN_S, max_s=POLL_MAX_S, target_posts=POLL_TARGET_POSTS)
+    return POLL_SCHEDULER
 
 def main():
     log("🚀 Auto Reels (WP→FB+IG) iniciado", "INFO")
+    if WEBHOOK_PORT:
+        hook = WebhookServer(enqueue_post, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET, log=log).start()
+        log(f"📡 Webhook em http://{hook.address[0]}:{hook.address[1]}/webhook", "INFO")
+    if METRICS_PORT:
+        METRICS.serve(port=METRICS_PORT)
+        log(f"📊 Métricas em http://127.0.0.1:{METRICS_PORT}/metrics", "INFO")
     while True:
-        process_once()
-        log("⏳ Fim do ciclo.", "INFO")
-        time.sleep(SLEEP_BETWEEN_RUNS)
+        t0 = time.monotonic()
+        with METRICS.span("cycle"):
+            res = process_once()
+        cycle = time.monotonic() - t0
+        if res is None:
+            delay = SLEEP_BETWEEN_RUNS    # config/erro: não insiste
+        else:
+            delay = get_poll_scheduler().next_delay(cycle, res["backlog"])
+        if res and res["backlog"]:
+            log(f"⏩ Ainda há posts no WP: novo ciclo já (ciclo levou {cycle:.0f}s)", "INFO")
+        else:
+            log(f"⏳ Fim do ciclo ({cycle:.0f}s). Próximo em {delay:.0f}s.", "INFO")
+        time.sleep(delay)
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+# arquivo: bench_render.py
+"""
+Benchmark dos caminhos quentes de arte e vídeo, offline:
+  render_art        auto_reels_wp_publish.render_art (foto + template + texto + JPEG)
+  render_card       arte_fixed.load_image_any + render_card (como no main do arte_fixed)
+  fit_title_in_box  só o ajuste do título (Anton, caixa do título)
+  make_video        auto_reels_wp_publish.make_video no VIDEO_PROFILE do .env
+Corpus sintético fixo: títulos curtos, muito longos, palavra gigante e cheios
+de emoji; fotos de 80 px a 6000 px (JPEG e PNG com alfa), geradas em
+OUT_DIR/bench/corpus e servidas por um HTTP local (o download passa pelo cache
+de imagens de verdade, num diretório só do benchmark).
+Cada benchmark roda num processo à parte (pico de RSS separado); a 1ª
+execução de cada caso é aquecimento e não entra na conta.
+Uso:
+  python bench_render.py                         # tudo, compara com a baseline
+  python bench_render.py --only render_art,fit_title_in_box --runs 10
+  python bench_render.py --save-baseline         # grava a baseline desta máquina
+Sai com código 1 se algum caso ficou mais lento (p50/p95) ou mais pesado
+(RSS) que a baseline além da tolerância. Grave e compare a baseline na mesma
+máquina, parada: com outros processos disputando a CPU o ruído passa de 20%.
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:   # Windows: sem pico de RSS
+    resource = None
+
+BASE = Path(__file__).parent
+BENCH_DIR = Path(os.getenv("OUT_DIR", str(BASE / "out"))) / "bench"
+CORPUS_DIR = BENCH_DIR / "corpus"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+BENCHES = ("render_art", "render_card", "fit_title_in_box", "make_video")
+MARK = "BENCH_JSON "
+MIN_DELTA_MS = 0.5   # abaixo disso é ruído do relógio, não regressão
+CORPUS_PATHS = {}    # nome -> arquivo (preenchido no processo filho)
+
+TITLES = {
+    "curto": "Chuva forte",
+    "normal": "Prefeitura de Santos anuncia novo horário dos ônibus a partir de segunda-feira",
+    "longo": ("Câmara de São Vicente aprova, em sessão extraordinária que atravessou a madrugada, "
+              "o projeto que reorganiza o transporte coletivo, cria faixas exclusivas na orla, "
+              "muda o horário de funcionamento do comércio no centro histórico e prevê audiências "
+              "públicas em todos os bairros antes da votação final do orçamento de 2026"),
+    "emoji": "🚨🔥 URGENTE: ressaca 🌊🌊 interdita praias em São Vicente e Praia Grande 😱🏖️ ‼️",
+    "palavra_gigante": "Pneumoultramicroscopicossilicovulcanoconiótico: médicos explicam a doença",
+    "entidades": "&#8220;Não vamos parar&#8221;, diz secretário sobre obras na Av. Ana Costa &amp; arredores",
+}
+
+# nome -> (largura, altura, formato)
+IMAGES = {
+    "mini": (80, 60, "JPEG"),
+    "media": (1600, 1067, "JPEG"),
+    "retrato": (1080, 1920, "JPEG"),
+    "alfa": (1200, 800, "PNG"),
+    "gigante": (6000, 4000, "JPEG"),
+}
+
+
+# ====== CORPUS ======
+def build_corpus(root: Path = CORPUS_DIR) -> dict:
+    """Gera (uma vez) as fotos sintéticas; devolve nome -> caminho."""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    root.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, (w, h, fmt) in IMAGES.items():
+        path = root / f"{name}.{'png' if fmt == 'PNG' else 'jpg'}"
+        paths[name] = path
+        if path.exists():
+            continue
+        rnd = random.Random(name)   # mesma imagem em toda máquina
+        mode = "RGBA" if fmt == "PNG" else "RGB"
+        img = Image.linear_gradient("L").resize((w, h)).convert(mode)
+        draw = ImageDraw.Draw(img)
+        for _ in range(60):
+            x0, y0 = rnd.randrange(w), rnd.randrange(h)
+            x1, y1 = x0 + rnd.randrange(1, max(2, w // 3)), y0 + rnd.randrange(1, max(2, h // 3))
+            color = tuple(rnd.randrange(256) for _ in range(len(mode)))
+            (draw.ellipse if rnd.random() < 0.5 else draw.rectangle)([x0, y0, x1, y1], fill=color)
+        if w * h <= 4_000_000:
+            img = img.filter(ImageFilter.GaussianBlur(2))   # textura de foto, não de desenho
+        tmp = path.with_name(f".tmp-{path.name}")
+        img.save(tmp, fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+        os.replace(tmp, path)
+    return paths
+
+
+def serve_corpus(root: Path = CORPUS_DIR):
+    """HTTP local para as fotos (o render_art baixa pela URL, como em produção)."""
+    class Quiet(SimpleHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Quiet, directory=str(root)))
+    threading.Thread(target=httpd.serve_forever, name="bench-http", daemon=True).start()
+    return httpd, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+
+def synthetic_post(pid, title, img_url=None, img_size=None) -> dict:
+    content = ""
+    if img_url:
+        w, h = img_size
+        content = f'<p>Texto do post.</p><figure><img src="{img_url}" width="{w}" height="{h}" /></figure>'
+    return {"id": pid, "title": {"rendered": title}, "content": {"rendered": content},
+            "link": f"https://exemplo.invalid/?p={pid}", "categories": []}
+
+
+# ====== MEDIÇÃO ======
+def peak_rss_mb(who=None) -> float | None:
+    if resource is None:
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    return round(kb / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)   # macOS: bytes
+
+
+def percentile(values, q) -> float:
+    vals = sorted(values)
+    k = (len(vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (k - lo)
+
+
+def timed(fn, runs) -> dict:
+    fn()   # aquecimento: caches de template/fonte/segmento, download da foto
+    times = []
+    for _ in range(max(1, runs)):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"runs": len(times), "ops_s": round(len(times) / sum(times), 2),
+            "p50_ms": round(percentile(times, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(times, 0.95) * 1000, 2)}
+
+
+# ====== BENCHMARKS (rodam no processo filho) ======
+def cases_render_art(app, url, tmp, runs):
+    out = {}
+    for img in IMAGES:
+        for tkey in ("normal", "longo", "emoji"):
+            post = synthetic_post(f"{img}-{tkey}", TITLES[tkey], f"{url}/{CORPUS_PATHS[img].name}",
+                                  IMAGES[img][:2])
+            out[f"{img}/{tkey}"] = timed(lambda: app.render_art(post, tmp / "arte.jpg"), runs)
+    out["sem_foto/curto"] = timed(lambda: app.render_art(synthetic_post("x", TITLES["curto"]),
+                                                         tmp / "arte.jpg"), runs)
+    return out
+
+
+def cases_render_card(app, url, tmp, runs):
+    import arte_fixed
+    out = {}
+    for img in IMAGES:
+        for tkey in ("normal", "longo", "emoji"):
+            def run(img=img, tkey=tkey):
+                bg = arte_fixed.load_image_any(str(CORPUS_PATHS[img]), cover=(arte_fixed.W, arte_fixed.PHOTO_H))
+                arte_fixed.render_card(bg, "Cidades", TITLES[tkey], logo_path=str(BASE / "logo_boca.png"))
+            out[f"{img}/{tkey}"] = timed(run, runs)
+    return out
+
+
+def cases_fit_title_in_box(app, url, tmp, runs):
+    from PIL import Image, ImageDraw
+    from font_cache import word_width
+    draw = ImageDraw.Draw(Image.new("RGB", (8, 8)))
+    y0 = app.TOP_IMAGE_H + app.RED_BAR_H
+    box = (app.WHITE_BOX_MARGIN, y0 + app.WHITE_BOX_MARGIN,
+           app.W - app.WHITE_BOX_MARGIN, y0 + app.WHITE_BOX_H - app.WHITE_BOX_MARGIN)
+    out = {}
+    for tkey, title in TITLES.items():
+        text = app.extract_title_text(synthetic_post(tkey, title))
+        fit = functools.partial(app.fit_title_in_box, draw, text, app.font_anton, box,
+                                max_size=app.TITLE_MAX_FONTSIZE, min_size=app.TITLE_MIN_FONTSIZE,
+                                max_lines=app.TITLE_MAX_LINES, line_spacing=app.TITLE_LINE_SPACING)
+        out[tkey] = timed(fit, runs * 20)
+        # frio: larguras de palavra fora do cache (título com palavras nunca vistas)
+        out[f"{tkey}/frio"] = timed(lambda: (word_width.cache_clear(), fit()), runs * 20)
+    return out
+
+
+def cases_make_video(app, url, tmp, runs):
+    out = {}
+    for img, tkey in (("media", "normal"), ("gigante", "emoji")):
+        canvas = app.render_art_image(synthetic_post(f"v-{img}", TITLES[tkey], f"{url}/{CORPUS_PATHS[img].name}",
+                                                     IMAGES[img][:2]))
+        res = timed(lambda: app.make_video(canvas, tmp / "reel.mp4", app.VIDEO_SECONDS), runs)
+        res["mp4_kb"] = round((tmp / "reel.mp4").stat().st_size / 1024)
+        out[f"{app.VIDEO_PROFILE}/{img}"] = res
+    return out
+
+
+def run_child(name, runs) -> dict:
+    """Roda um benchmark neste processo; devolve casos + pico de RSS."""
+    tmp = Path(tempfile.mkdtemp(prefix="reels_bench_"))
+    # cache de imagens e métricas isolados do uso normal
+    os.environ["IMG_CACHE_DIR"] = str(tmp / "img_cache")
+    os.environ["METRICS_FILE"] = ""
+    CORPUS_PATHS.update(build_corpus())
+    httpd, url = serve_corpus()
+    sys.path.insert(0, str(BASE))
+    os.chdir(BASE)   # arte_fixed acha as fontes pelo nome relativo
+    import auto_reels_wp_publish as app
+    try:
+        cases = globals()[f"cases_{name}"](app, url, tmp, runs)
+    finally:
+        httpd.shutdown()
+        shutil.rmtree(tmp, ignore_errors=True)
+    res = {"cases": cases, "rss_mb": peak_rss_mb()}
+    if name == "make_video":
+        res["ffmpeg_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None
+    return res
+
+
+def run_bench(name, runs) -> dict:
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--child", name, "--runs", str(runs)]
+    p = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8", cwd=str(BASE))
+    for line in reversed(p.stdout.splitlines()):
+        if line.startswith(MARK):
+            return json.loads(line[len(MARK):])
+    raise RuntimeError(f"benchmark {name} falhou:\n{p.stderr[-2000:]}")
+
+
+# ====== BASELINE ======
+def compare(results, baseline, tol, rss_tol) -> list[str]:
+    """Casos que pioraram além da tolerância (lista de mensagens)."""
+    bad = []
+    for bench, res in results.items():
+        base = baseline.get(bench)
+        if not base:
+            continue
+        for case, cur in res["cases"].items():
+            old = base["cases"].get(case)
+            if not old:
+                continue
+            # p95 oscila mais que a mediana: tolerância em dobro
+            for key, limit in (("p50_ms", tol), ("p95_ms", 2 * tol)):
+                if cur[key] > old[key] * (1 + limit) and cur[key] - old[key] >= MIN_DELTA_MS:
+                    bad.append(f"{bench} {case}: {key} {old[key]} -> {cur[key]} "
+                               f"(+{(cur[key] / old[key] - 1) * 100:.0f}%)")
+        for key in ("rss_mb", "ffmpeg_rss_mb"):
+            old, cur = base.get(key), res.get(key)
+            if old and cur and cur > old * (1 + rss_tol):
+                bad.append(f"{bench}: {key} {old} -> {cur} (+{(cur / old - 1) * 100:.0f}%)")
+    return bad
+
+
+def print_results(results, baseline):
+    print(f"{'benchmark':<17} {'caso':<26} {'ops/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'base p50':>9}")
+    for bench, res in results.items():
+        base = (baseline.get(bench) or {}).get("cases", {})
+        for case, r in res["cases"].items():
+            old = base.get(case, {}).get("p50_ms")
+            print(f"{bench:<17} {case:<26} {r['ops_s']:>8.2f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{old if old is not None else '-':>9}")
+        rss = f"pico RSS {res['rss_mb']} MB" if res.get("rss_mb") is not None else "pico RSS n/d"
+        if res.get("ffmpeg_rss_mb") is not None:
+            rss += f", ffmpeg {res['ffmpeg_rss_mb']} MB"
+        print(f"{bench:<17} {rss}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark offline de render_art, render_card, fit_title_in_box e make_video.")
+    ap.add_argument("--only", default=",".join(BENCHES), help="benchmarks separados por vírgula")
+    ap.add_argument("--runs", type=int, default=5, help="execuções medidas por caso (fit_title_in_box: x20)")
+    ap.add_argument("--video-runs", type=int, default=3, help="execuções medidas por caso do make_video")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    ap.add_argument("--save-baseline", action="store_true", help="grava os resultados como baseline")
+    ap.add_argument("--tolerance", type=float, default=0.20,
+                    help="piora aceita no p50 (0.20 = 20%%; no p95, o dobro)")
+    ap.add_argument("--rss-tolerance", type=float, default=0.10, help="piora aceita no pico de RSS")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(MARK + json.dumps(run_child(args.child, args.runs)), flush=True)
+        return
+
+    names = [n for n in args.only.split(",") if n]
+    unknown = set(names) - set(BENCHES)
+    if unknown:
+        ap.error(f"benchmark desconhecido: {', '.join(sorted(unknown))}")
+    results = {}
+    for name in names:
+        print(f"⏱️  {name}…", flush=True)
+        results[name] = run_bench(name, args.video_runs if name == "make_video" else args.runs)
+
+    path = Path(args.baseline)
+    baseline = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    print_results(results, baseline)
+    if args.save_baseline:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({**baseline, **results}, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"💾 Baseline gravada em {path}")
+        return
+    if not baseline:
+        print("ℹ️  Sem baseline para comparar (rode com --save-baseline).")
+        return
+    bad = compare(results, baseline, args.tolerance, args.rss_tolerance)
+    for msg in bad:
+        print(f"🐢 Regressão: {msg}")
+    if bad:
+        sys.exit(1)
+    print("✅ Sem regressões contra a baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# arquivo: compare_video_profiles.py
+"""
+Compara os perfis de encode (VIDEO_PROFILES) numa arte pronta:
+tempo de encode, tamanho do MP4 e qualidade (SSIM/PSNR do vídeo contra a
+própria arte). Serve para escolher o VIDEO_PROFILE do .env.
+Uso:
+  python compare_video_profiles.py out/arte_123.jpg [--profiles legacy,still] [--runs 3]
+"""
+
+import argparse
+import re
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import auto_reels_wp_publish as app
+
+# compara o encode completo de cada perfil, não o atalho do clipe repetido
+app.VIDEO_CLIP_SECONDS = 0
+
+
+def measure_quality(mp4: Path, jpg: Path) -> tuple[float | None, float | None]:
+    """SSIM/PSNR médios de todos os quadros contra a arte (em yuv420p)."""
+    graph = ("[0:v]format=yuv420p,split[d1][d2];[1:v]format=yuv420p,split[r1][r2];"
+             "[d1][r1]ssim=shortest=1;[d2][r2]psnr=shortest=1")
+    cmd = ["ffmpeg", "-hide_banner", "-i", str(mp4), "-loop", "1", "-i", str(jpg),
+           "-filter_complex", graph, "-f", "null", "-"]
+    err = subprocess.run(cmd, capture_output=True, text=True).stderr
+    ssim = re.search(r"SSIM .*All:([\d.]+)", err)
+    psnr = re.search(r"PSNR .*average:([\d.]+|inf)", err)
+    return (float(ssim.group(1)) if ssim else None,
+            float(psnr.group(1)) if psnr else None)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compara perfis de encode do make_video.")
+    ap.add_argument("arte", help="JPG da arte (ex.: out/arte_123.jpg)")
+    ap.add_argument("--profiles", default=",".join(app.VIDEO_PROFILES))
+    ap.add_argument("--runs", type=int, default=3, help="encodes por perfil (usa a mediana)")
+    args = ap.parse_args()
+
+    jpg = Path(args.arte)
+    tmp = Path(tempfile.mkdtemp(prefix="reels_prof_"))
+    print(f"{'perfil':<12} {'tempo (s)':>9} {'tamanho (KB)':>12} {'SSIM':>7} {'PSNR (dB)':>9}")
+    for name in args.profiles.split(","):
+        mp4 = tmp / f"{name}.mp4"
+        times = []
+        for _ in range(max(1, args.runs)):
+            t0 = time.perf_counter()
+            app.make_video(jpg, mp4, app.VIDEO_SECONDS, profile=name)
+            times.append(time.perf_counter() - t0)
+        secs = sorted(times)[len(times) // 2]
+        ssim, psnr = measure_quality(mp4, jpg)
+        print(f"{name:<12} {secs:>9.2f} {mp4.stat().st_size / 1024:>12.0f} "
+              f"{ssim if ssim is not None else float('nan'):>7.4f} {psnr if psnr is not None else float('nan'):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
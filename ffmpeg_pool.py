@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# arquivo: ffmpeg_pool.py
+"""
+Execução controlada do ffmpeg:
+  - no máximo `workers` processos ao mesmo tempo (os demais esperam a vez)
+  - `-threads N` por job, para vários encodes não brigarem pela CPU
+  - prioridade baixa (nice no Linux/macOS, BELOW_NORMAL no Windows)
+  - timeout de parede: estourou, mata o grupo de processos
+  - stderr guardado num buffer circular: o erro mostra o motivo real
+"""
+
+import collections
+import os
+import signal
+import subprocess
+import threading
+import time
+
+
+class FFmpegError(subprocess.CalledProcessError):
+    """CalledProcessError com o final do stderr no str()."""
+
+    def __str__(self):
+        base = super().__str__()
+        tail = [ln for ln in (self.stderr or "").splitlines() if ln.strip()][-3:]
+        return f"{base} | {' / '.join(tail)}" if tail else base
+
+
+class FFmpegTimeout(subprocess.TimeoutExpired):
+    def __str__(self):
+        base = f"ffmpeg passou de {self.timeout:.0f}s e foi encerrado"
+        tail = [ln for ln in (self.stderr or "").splitlines() if ln.strip()][-3:]
+        return f"{base} | {' / '.join(tail)}" if tail else base
+
+
+def _drain(stream, tail: collections.deque):
+    for raw in iter(stream.readline, b""):
+        tail.append(raw.decode("utf-8", "replace").rstrip())
+    stream.close()
+
+
+def _feed(stream, data: bytes):
+    try:
+        stream.write(data)
+    except (BrokenPipeError, OSError):
+        pass  # ffmpeg saiu antes de ler tudo; o código de saída conta a história
+    finally:
+        try:
+            stream.close()
+        except OSError:
+            pass
+
+
+class FFmpegPool:
+    def __init__(self, workers=1, threads=0, timeout=180.0, nice=10, stderr_lines=50):
+        self.workers = max(1, int(workers))
+        self.threads = int(threads)        # 0 = ffmpeg decide
+        self.timeout = float(timeout)
+        self.nice = int(nice)
+        self.stderr_lines = stderr_lines
+        self._sem = threading.BoundedSemaphore(self.workers)
+
+    def _prepare(self, cmd):
+        cmd = list(cmd)
+        if cmd and os.path.basename(cmd[0]).startswith("ffmpeg"):
+            cmd[1:1] = ["-hide_banner", "-nostats"]
+            if self.threads > 0:
+                # opção de saída: vai logo antes do arquivo de destino
+                cmd[-1:-1] = ["-threads", str(self.threads)]
+        return cmd
+
+    def _spawn_kwargs(self):
+        if os.name == "nt":
+            flags = subprocess.CREATE_NEW_PROCESS_GROUP
+            if self.nice > 0:
+                flags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+            return {"creationflags": flags}
+        return {"start_new_session": True}
+
+    def _lower_priority(self, proc):
+        if self.nice > 0 and hasattr(os, "setpriority"):
+            try:
+                os.setpriority(os.PRIO_PROCESS, proc.pid, self.nice)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _kill(proc):
+        try:
+            if os.name == "nt":
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, OSError):
+            pass
+
+    def run(self, cmd, input: bytes | None = None, timeout: float | None = None):
+        """Roda o comando esperando vaga no pool. Levanta FFmpegError/FFmpegTimeout."""
+        timeout = self.timeout if timeout is None else timeout
+        cmd = self._prepare(cmd)
+        with self._sem:
+            t0 = time.monotonic()
+            proc = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                **self._spawn_kwargs(),
+            )
+            self._lower_priority(proc)
+            tail = collections.deque(maxlen=self.stderr_lines)
+            reader = threading.Thread(target=_drain, args=(proc.stderr, tail), daemon=True)
+            reader.start()
+            writer = None
+            if input is not None:
+                writer = threading.Thread(target=_feed, args=(proc.stdin, input), daemon=True)
+                writer.start()
+            try:
+                rc = proc.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                self._kill(proc)
+                proc.wait()
+                reader.join(2)
+                raise FFmpegTimeout(cmd, timeout, stderr="\n".join(tail))
+            if writer:
+                writer.join()
+            reader.join()
+            if rc != 0:
+                raise FFmpegError(rc, cmd, stderr="\n".join(tail))
+            return time.monotonic() - t0
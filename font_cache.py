@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# arquivo: font_cache.py
+"""
+Cache de fontes e de larguras de texto (compartilhado pelo processo).
+  - cached_truetype: um FreeTypeFont por (caminho, tamanho, layout engine);
+    não relê o .ttf a cada tamanho testado no ajuste do título
+  - word_width / space_width: largura de uma linha = soma das palavras em
+    cache + espaços, sem re-shaping dos prefixos da linha
+"""
+
+from functools import lru_cache
+
+from PIL import ImageFont
+
+
+@lru_cache(maxsize=256)
+def cached_truetype(path: str, size: int, layout_engine=None) -> ImageFont.FreeTypeFont:
+    """ImageFont.truetype memoizado; exceções (arquivo ausente) não ficam em cache."""
+    return ImageFont.truetype(str(path), size=size, layout_engine=layout_engine)
+
+
+@lru_cache(maxsize=1 << 16)
+def word_width(font, word: str) -> float:
+    # as fontes vêm de cached_truetype, então o objeto serve de chave
+    return font.getlength(word)
+
+
+def space_width(font) -> float:
+    return word_width(font, " ")
+
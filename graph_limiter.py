@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+# arquivo: graph_limiter.py
+"""
+Agendador das chamadas à Graph API, ciente dos limites da Meta:
+  - um token bucket por família de endpoint (videos, media, media_publish,
+    status, chunk = pedaços de upload): sob backlog vai o mais rápido que o
+    balde deixa
+  - lê X-App-Usage / X-Page-Usage / X-Business-Use-Case-Usage (0-100%):
+    acima de `soft_usage` reduz a taxa proporcionalmente; em 100% pausa
+  - erros de limite (4, 17, 32, 613 e 80001-80014 de BUC) pausam a família
+    pelo estimated_time_to_regain_access (ou backoff) e repetem a chamada;
+    se o limite passa de max_pause (ou acabam as tentativas), levanta
+    GraphThrottled e o job volta para a fila
+GraphSession expõe get/post como requests.Session, então as funções da
+Graph só trocam a sessão.
+"""
+
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+from ig_poller import backoff_delays
+
+THROTTLE_CODES = {4, 17, 32, 613} | set(range(80001, 80015))
+GLOBAL_CODES   = {4, 17, 32}   # app / usuário / página inteira: pausa todas as famílias
+
+
+class GraphThrottled(requests.RequestException):
+    """Limite da Graph longo demais para esperar aqui: tentar no próximo ciclo."""
+
+
+class TokenBucket:
+    def __init__(self, per_min: float, burst: int):
+        self.rate = per_min / 60.0
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, factor: float = 1.0) -> float:
+        """Consome 1 ficha; devolve quanto esperar antes de usar (0 = já)."""
+        with self.lock:
+            now = time.monotonic()
+            rate = self.rate * factor
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * rate)
+            self.stamp = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+
+def endpoint_family(method: str, url: str, data=None) -> str:
+    parts = urlparse(url).path.strip("/").split("/")
+    if parts and parts[0] == "ig-api-upload":
+        return "chunk"
+    if isinstance(data, dict) and data.get("upload_phase") == "transfer":
+        return "chunk"
+    if method == "GET":
+        return "status"
+    return parts[-1] if parts[-1] in ("videos", "media", "media_publish") else "other"
+
+
+def usage_percent(headers) -> tuple[float | None, float]:
+    """(maior uso em %, segundos estimados até liberar) a partir dos cabeçalhos.
+    Uso None = resposta sem cabeçalho de uso."""
+    top, regain = None, 0.0
+    for name in ("X-App-Usage", "X-Page-Usage", "X-Ad-Account-Usage"):
+        raw = headers.get(name)
+        if raw:
+            try:
+                top = max([top or 0.0] + [float(v) for v in json.loads(raw).values() if isinstance(v, (int, float))])
+            except (ValueError, AttributeError):
+                pass
+    raw = headers.get("X-Business-Use-Case-Usage")
+    if raw:
+        try:
+            for entries in json.loads(raw).values():
+                for e in entries:
+                    top = max(top or 0.0, *(float(e.get(k) or 0) for k in ("call_count", "total_cputime", "total_time")))
+                    regain = max(regain, float(e.get("estimated_time_to_regain_access") or 0) * 60)
+        except (ValueError, AttributeError, TypeError):
+            pass
+    return top, regain
+
+
+class GraphScheduler:
+    def __init__(self, limits: dict, soft_usage=70.0, max_pause=900.0, retries=4, log=None, on_retry=None):
+        # limits: família -> (chamadas por minuto, rajada); família sem entrada não espera
+        self.buckets = {fam: TokenBucket(*lim) for fam, lim in limits.items()}
+        self.soft_usage = soft_usage
+        self.max_pause = max_pause
+        self.retries = retries
+        self.log = log or (lambda msg, level="INFO": None)
+        self.on_retry = on_retry or (lambda: None)
+        self.usage = 0.0
+        self.paused_until = {}          # família ("*" = todas) -> monotonic
+        self._lock = threading.Lock()
+
+    # ---- estado ----
+    def factor(self) -> float:
+        if self.usage <= self.soft_usage:
+            return 1.0
+        return max(0.05, (100.0 - self.usage) / (100.0 - self.soft_usage))
+
+    def pause(self, family: str, seconds: float, why: str):
+        until = time.monotonic() + seconds
+        with self._lock:
+            if until > self.paused_until.get(family, 0):
+                self.paused_until[family] = until
+                self.log(f"🚦 Graph: pausa de {seconds:.0f}s em '{family}' ({why})", "INFO")
+
+    def _wait(self, family: str):
+        while True:
+            with self._lock:
+                until = max(self.paused_until.get(family, 0), self.paused_until.get("*", 0))
+            delay = until - time.monotonic()
+            if delay <= 0:
+                break
+            time.sleep(min(delay, 5))
+        bucket = self.buckets.get(family)
+        if bucket:
+            delay = bucket.take(self.factor())
+            if delay > 0:
+                time.sleep(delay)
+
+    def _observe(self, family: str, r) -> tuple[float, str] | None:
+        """Atualiza o uso; se a resposta foi de limite, devolve (pausa em s, escopo)."""
+        top, regain = usage_percent(r.headers)
+        if top is not None:
+            with self._lock:
+                self.usage = top
+        if top is not None and top >= 100:
+            self.pause("*", regain or 60, f"uso {top:.0f}%")
+        if r.status_code < 400:
+            return None
+        try:
+            err = r.json().get("error") or {}
+        except ValueError:
+            return None
+        code = err.get("code")
+        if code in THROTTLE_CODES or err.get("error_subcode") in THROTTLE_CODES:
+            scope = "*" if code in GLOBAL_CODES or family == "other" else family
+            return (regain or -1.0), scope    # -1: sem estimativa, usa backoff
+        return None
+
+    # ---- chamada ----
+    def request(self, session, method: str, url: str, **kw):
+        family = endpoint_family(method, url, kw.get("data"))
+        delays = backoff_delays(30, 2, self.max_pause)
+        for attempt in range(self.retries + 1):
+            self._wait(family)
+            r = session.request(method, url, **kw)
+            hit = self._observe(family, r)
+            if hit is None:
+                return r
+            wait, scope = hit
+            wait = wait if wait > 0 else next(delays)
+            if wait > self.max_pause or attempt == self.retries:
+                # limite longo demais: não vira "falhou" (None) lá em cima, o job tenta de novo
+                raise GraphThrottled(f"limite da Graph em {method} {family} "
+                                     f"(liberação em ~{wait:.0f}s): {r.text[:200]}", response=r)
+            self.pause(scope, wait, f"erro de limite em {method} {family}")
+            self.on_retry()
+
+
+class GraphSession:
+    """Fachada com get/post de requests.Session passando pelo agendador."""
+
+    def __init__(self, session, scheduler: GraphScheduler):
+        self.session = session
+        self.scheduler = scheduler
+
+    def get(self, url, **kw):
+        return self.scheduler.request(self.session, "GET", url, **kw)
+
+    def post(self, url, **kw):
+        return self.scheduler.request(self.session, "POST", url, **kw)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# arquivo: graph_upload.py
+"""
+Upload direto do mp4 para a Graph API (sem passar pelo Cloudinary):
+  - Página (FB):  /{page}/videos em fases start / transfer / finish
+                  (o servidor diz qual pedaço mandar: start_offset..end_offset)
+  - IG Reels:     /{ig}/media com upload_type=resumable + POST no rupload
+                  com os cabeçalhos offset / file_size, em pedaços
+O progresso fica num dict `state` que é gravado a cada pedaço (save(state));
+com o mesmo state, uma nova chamada continua de onde parou.
+"""
+
+import time
+
+import requests
+
+from graph_limiter import GraphThrottled
+from ig_poller import backoff_delays
+
+
+class UploadError(RuntimeError):
+    pass
+
+
+def _json(r) -> dict:
+    try:
+        return r.json()
+    except ValueError:
+        return {}
+
+
+def _post_retry(session, url, retries, timeout, on_retry=None, **kw):
+    """POST com novas tentativas só para falha de rede/5xx (o resto volta como veio)."""
+    delays = backoff_delays(1, 2, 30)
+    for attempt in range(retries + 1):
+        if attempt and on_retry:
+            on_retry()
+        try:
+            r = session.post(url, timeout=timeout, **kw)
+            if r.status_code < 500 or attempt == retries:
+                return r
+        except GraphThrottled:
+            raise   # o agendador já desistiu de esperar: não insiste aqui
+        except requests.RequestException:
+            if attempt == retries:
+                raise
+        time.sleep(next(delays))
+
+
+def fb_chunked_upload(session, graph_url, page_id, token, path, description,
+                      state: dict, save=None, progress=None, retries=3, timeout=120, on_retry=None) -> str:
+    """Envia o vídeo para a Página em pedaços. Devolve o video_id."""
+    save = save or (lambda s: None)
+    url = f"{graph_url}/{page_id}/videos"
+    size = path.stat().st_size
+    if not state.get("session_id") or state.get("size") != size:
+        r = _post_retry(session, url, retries, timeout, on_retry,
+                        data={"access_token": token, "upload_phase": "start", "file_size": size})
+        j = _json(r)
+        if r.status_code != 200 or "upload_session_id" not in j:
+            raise UploadError(f"FB start {r.status_code}: {r.text[:300]}")
+        state.clear()
+        state.update(session_id=j["upload_session_id"], video_id=j.get("video_id"), size=size,
+                     start=int(j["start_offset"]), end=int(j["end_offset"]))
+        save(state)
+
+    realigns = 0
+    with open(path, "rb") as f:
+        while state["start"] < state["end"]:
+            f.seek(state["start"])
+            chunk = f.read(state["end"] - state["start"])
+            r = _post_retry(session, url, retries, timeout, on_retry,
+                            data={"access_token": token, "upload_phase": "transfer",
+                                  "upload_session_id": state["session_id"],
+                                  "start_offset": state["start"]},
+                            files={"video_file_chunk": ("chunk", chunk, "application/octet-stream")})
+            j = _json(r)
+            if r.status_code != 200:
+                # offset fora de sincronia: o erro traz o pedaço que o servidor espera
+                data = (j.get("error") or {}).get("error_data") or {}
+                if "start_offset" in data and realigns < 3:
+                    realigns += 1
+                    state.update(start=int(data["start_offset"]), end=int(data["end_offset"]))
+                    save(state)
+                    continue
+                raise UploadError(f"FB transfer {r.status_code}: {r.text[:300]}")
+            state.update(start=int(j["start_offset"]), end=int(j["end_offset"]))
+            save(state)
+            if progress:
+                progress("fb", min(state["start"], size), size)
+
+    r = _post_retry(session, url, retries, timeout, on_retry,
+                    data={"access_token": token, "upload_phase": "finish",
+                          "upload_session_id": state["session_id"], "description": description[:2200]})
+    if r.status_code != 200 or not _json(r).get("success"):
+        raise UploadError(f"FB finish {r.status_code}: {r.text[:300]}")
+    return state["video_id"]
+
+
+def ig_resumable_upload(session, graph_url, rupload_url, api_v, ig_id, token, path, caption,
+                        state: dict, save=None, progress=None, chunk_size=8 << 20,
+                        retries=3, timeout=120, on_retry=None) -> str:
+    """Cria o container REELS resumable e envia o arquivo. Devolve o container id."""
+    save = save or (lambda s: None)
+    size = path.stat().st_size
+    if not state.get("container_id") or state.get("size") != size:
+        r = _post_retry(session, f"{graph_url}/{ig_id}/media", retries, timeout, on_retry,
+                        data={"access_token": token, "media_type": "REELS",
+                              "upload_type": "resumable", "caption": caption[:2200]})
+        j = _json(r)
+        if r.status_code != 200 or "id" not in j:
+            raise UploadError(f"IG /media resumable {r.status_code}: {r.text[:300]}")
+        state.clear()
+        state.update(container_id=j["id"], size=size, offset=0)
+        save(state)
+
+    uri = f"{rupload_url}/ig-api-upload/{api_v}/{state['container_id']}"
+    restarted = False
+    with open(path, "rb") as f:
+        while state["offset"] < size:
+            f.seek(state["offset"])
+            chunk = f.read(chunk_size)
+            r = _post_retry(session, uri, retries, timeout, on_retry, data=chunk,
+                            headers={"Authorization": f"OAuth {token}",
+                                     "offset": str(state["offset"]), "file_size": str(size),
+                                     "Content-Type": "application/octet-stream"})
+            if r.status_code != 200:
+                # o servidor não aceitou o offset salvo: recomeça o arquivo uma vez
+                if state["offset"] and not restarted:
+                    restarted = True
+                    state["offset"] = 0
+                    save(state)
+                    continue
+                raise UploadError(f"IG rupload {r.status_code}: {r.text[:300]}")
+            state["offset"] += len(chunk)
+            save(state)
+            if progress:
+                progress("ig", state["offset"], size)
+    return state["container_id"]
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# arquivo: ig_poller.py
+"""
+Poller de containers do Instagram (REELS) em background.
+Uma única thread acompanha todos os containers pendentes; cada um tem seu
+próprio relógio com backoff adaptativo (checagens rápidas no começo, mais
+espaçadas depois). Quando o status vira FINISHED/ERROR ou estoura o tempo,
+chama on_done(container_id, ctx, ok) — quem publica é o callback, num pool
+à parte (done_workers): um publish lento ou pausado pelo limite da Graph não
+segura a checagem dos outros containers.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def backoff_delays(first=3.0, factor=1.6, max_delay=30.0):
+    """Gera os intervalos entre checagens: 3, 4.8, 7.7, ... até max_delay."""
+    d = first
+    while True:
+        yield d
+        d = min(max_delay, d * factor)
+
+
+class ContainerPoller:
+    def __init__(self, check_status, on_done, max_wait=480,
+                 first_delay=3.0, factor=1.6, max_delay=30.0, log=None, done_workers=2):
+        self.check_status = check_status      # fn(container_id) -> "FINISHED" | "ERROR" | outro | None
+        self.on_done = on_done                # fn(container_id, ctx, ok: bool)
+        self.max_wait = max_wait
+        self.first_delay = first_delay
+        self.factor = factor
+        self.max_delay = max_delay
+        self.log = log or (lambda msg, level="INFO": None)
+        self._heap = []                       # (proxima_checagem, seq, container_id)
+        self._items = {}                      # container_id -> [ctx, deadline, delays]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stop = False
+        self._done_pool = ThreadPoolExecutor(max_workers=done_workers, thread_name_prefix="ig-publish")
+
+    def start(self):
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return self
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="ig-poller", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+
+    def add(self, container_id: str, ctx=None):
+        now = time.monotonic()
+        delays = backoff_delays(self.first_delay, self.factor, self.max_delay)
+        with self._cond:
+            if container_id in self._items:   # já acompanhando (ex.: job retomado)
+                self._items[container_id][0] = ctx
+                return
+            self._items[container_id] = [ctx, now + self.max_wait, delays]
+            heapq.heappush(self._heap, (now + next(delays), next(self._seq), container_id))
+            self._cond.notify_all()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def wait_idle(self, timeout=None) -> bool:
+        """Bloqueia até não haver containers pendentes (ou timeout)."""
+        end = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._items:
+                left = None if end is None else end - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    # ---- interno ----
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stop and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    self._cond.wait(None if not self._heap else self._heap[0][0] - time.monotonic())
+                if self._stop:
+                    return
+                _, _, cid = heapq.heappop(self._heap)
+                if cid not in self._items:
+                    continue
+                ctx, deadline, delays = self._items[cid]
+
+            try:
+                st = self.check_status(cid)
+            except Exception as e:
+                self.log(f"⚠️ IG status {cid} falhou: {e}", "INFO")
+                st = None
+
+            if st == "FINISHED" or st == "ERROR":
+                self._finish(cid, ctx, st == "FINISHED")
+                continue
+            now = time.monotonic()
+            if now >= deadline:
+                self._finish(cid, ctx, False)
+                continue
+            with self._cond:
+                heapq.heappush(self._heap, (min(deadline, now + next(delays)), next(self._seq), cid))
+
+    def _finish(self, cid, ctx, ok):
+        # continua em _items até o callback terminar (wait_idle espera a publicação)
+        self._done_pool.submit(self._call_done, cid, ctx, ok)
+
+    def _call_done(self, cid, ctx, ok):
+        try:
+            self.on_done(cid, ctx, ok)
+        except Exception as e:
+            self.log(f"❌ IG callback {cid} falhou: {e}", "ERROR")
+        with self._cond:
+            self._items.pop(cid, None)
+            self._cond.notify_all()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# arquivo: img_cache.py
+"""
+Cache em disco das imagens de origem (compartilhado por auto_reels_wp_publish
+e arte_fixed).
+  - chave por URL, com ETag/Last-Modified para revalidar (304 = usa o disco)
+  - conteúdo endereçado por sha256: a mesma foto vinda de URLs diferentes
+    ocupa um arquivo só
+  - teto de tamanho com despejo LRU
+  - se a rede falhar e houver cópia, serve a cópia (stale-if-error)
+Config (.env): IMG_CACHE_DIR (padrão OUT_DIR/img_cache), IMG_CACHE_MAX_MB, IMG_CACHE_FRESH_S
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+
+def default_dir() -> Path:
+    """img_cache dentro do OUT_DIR (lido na hora: o .env carrega depois do import)."""
+    return Path(os.getenv("OUT_DIR", str(Path(__file__).parent / "out"))) / "img_cache"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url           TEXT PRIMARY KEY,
+    sha256        TEXT NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    checked_at    REAL
+);
+CREATE INDEX IF NOT EXISTS urls_sha ON urls (sha256);
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256    TEXT PRIMARY KEY,
+    size      INTEGER NOT NULL,
+    last_used REAL
+);
+"""
+
+
+class ImageCache:
+    def __init__(self, root: Path | None = None, max_bytes: int = 512 << 20, fresh_s: float = 3600):
+        self.root = Path(root or default_dir())
+        self.blobs = self.root / "blobs"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.fresh_s = fresh_s
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def blob_path(self, sha: str) -> Path:
+        return self.blobs / sha[:2] / sha
+
+    def fetch(self, url: str, session=None, headers=None, timeout=30, max_bytes=None) -> Path:
+        """Devolve o caminho local da imagem (baixa/revalida se preciso).
+        max_bytes: aborta o download (ValueError) se a imagem passar disso."""
+        session = session or requests
+        with self._lock:
+            row = self._db.execute("SELECT sha256, etag, last_modified, checked_at FROM urls WHERE url=?",
+                                   (url,)).fetchone()
+        cached = None
+        if row and self.blob_path(row[0]).exists():
+            cached = self.blob_path(row[0])
+            if time.time() - (row[3] or 0) < self.fresh_s:
+                self._touch(row[0])
+                return cached
+
+        h = dict(headers or {})
+        if cached is not None:
+            if row[1]:
+                h["If-None-Match"] = row[1]
+            if row[2]:
+                h["If-Modified-Since"] = row[2]
+        try:
+            r = session.get(url, headers=h, timeout=timeout, stream=True)
+            if r.status_code == 304 and cached is not None:
+                r.close()
+                with self._lock:
+                    self._db.execute("UPDATE urls SET checked_at=? WHERE url=?", (time.time(), url))
+                self._touch(row[0])
+                return cached
+            try:
+                r.raise_for_status()
+            except Exception:
+                r.close()   # stream=True: sem close a conexão não volta para o pool
+                raise
+            sha = self._store(r, max_bytes)
+        except Exception:
+            if cached is not None:
+                return cached
+            raise
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO urls (url, sha256, etag, last_modified, checked_at) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(url) DO UPDATE SET sha256=excluded.sha256, etag=excluded.etag, "
+                "last_modified=excluded.last_modified, checked_at=excluded.checked_at",
+                (url, sha, r.headers.get("ETag"), r.headers.get("Last-Modified"), time.time()))
+        self._evict()
+        return self.blob_path(sha)
+
+    # ---- interno ----
+    def _store(self, r, max_bytes=None) -> str:
+        """Grava a resposta em streaming, calculando o sha256 no caminho."""
+        h = hashlib.sha256()
+        tmp = self.blobs / f".tmp-{os.getpid()}-{threading.get_ident()}"
+        size = 0
+        try:
+            declared = int(r.headers.get("Content-Length") or 0)
+            if max_bytes and declared > max_bytes:
+                raise ValueError(f"imagem grande demais: {declared} bytes (teto {max_bytes})")
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(64 * 1024):
+                    size += len(chunk)
+                    if max_bytes and size > max_bytes:
+                        raise ValueError(f"imagem grande demais: > {max_bytes} bytes")
+                    h.update(chunk)
+                    f.write(chunk)
+            sha = h.hexdigest()
+            dst = self.blob_path(sha)
+            if dst.exists():
+                tmp.unlink()          # mesma foto por outra URL
+            else:
+                dst.parent.mkdir(exist_ok=True)
+                os.replace(tmp, dst)
+        finally:
+            r.close()
+            if tmp.exists():
+                tmp.unlink()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO blobs (sha256, size, last_used) VALUES (?,?,?) "
+                "ON CONFLICT(sha256) DO UPDATE SET last_used=excluded.last_used",
+                (sha, size, time.time()))
+        return sha
+
+    def _touch(self, sha: str):
+        with self._lock:
+            self._db.execute("UPDATE blobs SET last_used=? WHERE sha256=?", (time.time(), sha))
+
+    def _evict(self):
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for sha, size in self._db.execute("SELECT sha256, size FROM blobs ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.blob_path(sha).unlink(missing_ok=True)
+                self._db.execute("DELETE FROM blobs WHERE sha256=?", (sha,))
+                self._db.execute("DELETE FROM urls WHERE sha256=?", (sha,))
+                total -= size
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache() -> ImageCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ImageCache(
+                Path(os.getenv("IMG_CACHE_DIR", str(default_dir()))),
+                max_bytes=int(float(os.getenv("IMG_CACHE_MAX_MB", "512")) * (1 << 20)),
+                fresh_s=float(os.getenv("IMG_CACHE_FRESH_S", "3600")),
+            )
+        return _CACHE
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+# arquivo: job_store.py
+"""
+Estado durável dos posts (SQLite em modo WAL), um registro por post.
+Cada estágio grava seu checkpoint (arte, hash do mp4, URL do Cloudinary,
+id do vídeo no FB, container do IG, publicado), então depois de um crash o
+loop retoma no primeiro estágio que faltou em vez de refazer tudo.
+A tabela uploads guarda sha256 do mp4 -> URL no Cloudinary: o mesmo vídeo
+não sobe duas vezes.
+Substitui out/processed.json (importado na 1ª execução, junto com o antigo
+processed_post_ids.txt).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    post_id         TEXT PRIMARY KEY,
+    post_json       TEXT,
+    arte_path       TEXT,
+    mp4_path        TEXT,
+    mp4_sha256      TEXT,
+    cloud_url       TEXT,
+    fb_video_id     TEXT,
+    ig_container_id TEXT,
+    fb_error        TEXT,
+    ig_error        TEXT,
+    fb_upload       TEXT,
+    ig_upload       TEXT,
+    ig_published    INTEGER NOT NULL DEFAULT 0,
+    done            INTEGER NOT NULL DEFAULT 0,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    created_at      REAL,
+    updated_at      REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (done, attempts);
+CREATE TABLE IF NOT EXISTS uploads (
+    sha256      TEXT PRIMARY KEY,
+    secure_url  TEXT NOT NULL,
+    created_at  REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# colunas que os estágios podem atualizar
+STAGE_FIELDS = ("arte_path", "mp4_path", "mp4_sha256", "cloud_url",
+                "fb_video_id", "ig_container_id", "ig_published",
+                "fb_error", "ig_error", "fb_upload", "ig_upload")
+
+# colunas novas em bancos já existentes (nome, tipo)
+ADDED_COLUMNS = (("fb_error", "TEXT"), ("ig_error", "TEXT"),
+                 ("fb_upload", "TEXT"), ("ig_upload", "TEXT"))   # progresso do upload direto (JSON)
+
+
+class JobStore:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        have = {r["name"] for r in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, typ in ADDED_COLUMNS:
+            if name not in have:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {typ}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ---- leitura ----
+    def get(self, post_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE post_id=?", (str(post_id),)).fetchone()
+        return self._as_job(row) if row else None
+
+    def is_done(self, post_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT done FROM jobs WHERE post_id=?", (str(post_id),)).fetchone()
+        return bool(row and row["done"])
+
+    def unfinished(self, max_attempts: int) -> list[dict]:
+        """Jobs que começaram e não terminaram (para retomar)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE done=0 AND attempts<? AND post_json IS NOT NULL ORDER BY created_at",
+                (max_attempts,)).fetchall()
+        return [self._as_job(r) for r in rows]
+
+    # ---- escrita ----
+    def begin(self, post_id: str, post: dict) -> dict:
+        """Cria (ou reaproveita) o job do post e devolve com os checkpoints."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (post_id, post_json, created_at, updated_at) VALUES (?,?,?,?) "
+                "ON CONFLICT(post_id) DO UPDATE SET post_json=excluded.post_json, updated_at=excluded.updated_at",
+                (str(post_id), json.dumps(post, ensure_ascii=False), now, now))
+            row = self._db.execute("SELECT * FROM jobs WHERE post_id=?", (str(post_id),)).fetchone()
+        return self._as_job(row)
+
+    def update(self, post_id: str, **fields):
+        bad = set(fields) - set(STAGE_FIELDS)
+        if bad:
+            raise ValueError(f"campos inválidos: {sorted(bad)}")
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {cols}, updated_at=? WHERE post_id=?",
+                             (*fields.values(), time.time(), str(post_id)))
+
+    def fail(self, post_id: str, error: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET attempts=attempts+1, last_error=?, updated_at=? WHERE post_id=?",
+                             (str(error)[:1000], time.time(), str(post_id)))
+
+    def mark_done(self, post_id: str):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (post_id, done, created_at, updated_at) VALUES (?,1,?,?) "
+                "ON CONFLICT(post_id) DO UPDATE SET done=1, updated_at=excluded.updated_at",
+                (str(post_id), now, now))
+
+    # ---- uploads por conteúdo (sha256 do mp4 -> URL no Cloudinary) ----
+    def upload_url(self, sha256: str) -> str | None:
+        with self._lock:
+            row = self._db.execute("SELECT secure_url FROM uploads WHERE sha256=?", (sha256,)).fetchone()
+        return row["secure_url"] if row else None
+
+    def save_upload(self, sha256: str, secure_url: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO uploads (sha256, secure_url, created_at) VALUES (?,?,?) "
+                "ON CONFLICT(sha256) DO UPDATE SET secure_url=excluded.secure_url",
+                (sha256, secure_url, time.time()))
+
+    # ---- migração ----
+    def import_legacy(self, processed_json: Path, ids_txt: Path) -> int:
+        """Importa processed.json / processed_post_ids.txt uma única vez."""
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM meta WHERE key='legacy_imported'").fetchone():
+                return 0
+        ids = set()
+        if processed_json.exists():
+            try:
+                ids |= {str(x) for x in json.loads(processed_json.read_text(encoding="utf-8"))}
+            except Exception:
+                pass
+        if ids_txt.exists():
+            ids |= {ln.strip() for ln in ids_txt.read_text(encoding="utf-8").splitlines() if ln.strip()}
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO jobs (post_id, done, created_at, updated_at) VALUES (?,1,?,?) "
+                "ON CONFLICT(post_id) DO UPDATE SET done=1",
+                [(i, now, now) for i in sorted(ids)])
+            self._db.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)", (str(len(ids)),))
+            self._db.execute("COMMIT")
+        return len(ids)
+
+    @staticmethod
+    def _as_job(row) -> dict:
+        job = dict(row)
+        job["pid"] = job.pop("post_id")
+        post_json = job.pop("post_json", None)
+        job["post"] = json.loads(post_json) if post_json else None
+        return job
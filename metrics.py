@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# arquivo: metrics.py
+"""
+Medição por estágio e por post:
+  - span("make_video", post_id=..., bytes=...): mede a duração, o resultado
+    (ok/erro), bytes e tentativas; grava uma linha JSON por span
+  - histogramas de latência e contadores em memória, expostos no formato
+    texto do Prometheus por um servidor HTTP local opcional (/metrics)
+  - note_retry(): soma 1 tentativa no span aberto na thread atual (usado pelo
+    agendador da Graph e pelo upload direto)
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Span:
+    def __init__(self, name, post_id=None, **attrs):
+        self.name = name
+        self.post_id = post_id
+        self.retries = 0
+        self.bytes = int(attrs.pop("bytes", 0) or 0)
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        if "bytes" in attrs:
+            self.bytes = int(attrs.pop("bytes") or 0)
+        self.attrs.update(attrs)
+
+
+class Metrics:
+    def __init__(self, jsonl_path: Path | None = None, max_file_mb=50):
+        self.path = Path(jsonl_path) if jsonl_path else None
+        self.max_bytes = int(max_file_mb * (1 << 20))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hist = {}      # stage -> [contagem por bucket..., +Inf]
+        self.sums = {}      # stage -> soma das durações
+        self.count = {}     # (stage, status) -> n
+        self.bytes = {}     # stage -> bytes
+        self.retries = {}   # stage -> tentativas extras
+
+    # ---- spans ----
+    @contextmanager
+    def span(self, name, post_id=None, **attrs):
+        sp = Span(name, post_id, **attrs)
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(sp)
+        t0, wall = time.perf_counter(), time.time()
+        status, error = "ok", None
+        try:
+            yield sp
+        except BaseException as e:
+            status, error = "error", f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            stack.pop()
+            self.record(sp, time.perf_counter() - t0, status, error, wall)
+
+    def note_retry(self, n=1):
+        stack = self._local.__dict__.get("stack")
+        if stack:
+            stack[-1].retries += n
+
+    def record(self, sp: Span, seconds: float, status="ok", error=None, started=None):
+        """Registra um span (também serve para durações medidas fora do `with`)."""
+        with self._lock:
+            h = self.hist.setdefault(sp.name, [0] * (len(BUCKETS) + 1))
+            for i, b in enumerate(BUCKETS):
+                if seconds <= b:
+                    h[i] += 1
+            h[-1] += 1
+            self.sums[sp.name] = self.sums.get(sp.name, 0.0) + seconds
+            self.count[(sp.name, status)] = self.count.get((sp.name, status), 0) + 1
+            self.bytes[sp.name] = self.bytes.get(sp.name, 0) + sp.bytes
+            self.retries[sp.name] = self.retries.get(sp.name, 0) + sp.retries
+            if self.path:
+                rec = {"ts": round(started or (time.time() - seconds), 3), "stage": sp.name,
+                       "post_id": sp.post_id, "seconds": round(seconds, 4), "status": status,
+                       "bytes": sp.bytes, "retries": sp.retries, **sp.attrs}
+                if error:
+                    rec["error"] = error
+                self._write(json.dumps(rec, ensure_ascii=False, default=str))
+
+    def _write(self, line: str):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                os.replace(self.path, self.path.with_suffix(self.path.suffix + ".1"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError:
+            pass
+
+    # ---- exposição ----
+    def prometheus(self) -> str:
+        out = ["# HELP reels_stage_seconds Duração dos estágios por post.",
+               "# TYPE reels_stage_seconds histogram"]
+        with self._lock:
+            for stage in sorted(self.hist):
+                h = self.hist[stage]
+                for b, n in zip(BUCKETS, h):
+                    out.append(f'reels_stage_seconds_bucket{{stage="{stage}",le="{b}"}} {n}')
+                out.append(f'reels_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h[-1]}')
+                out.append(f'reels_stage_seconds_sum{{stage="{stage}"}} {self.sums[stage]:.6f}')
+                out.append(f'reels_stage_seconds_count{{stage="{stage}"}} {h[-1]}')
+            out += ["# HELP reels_stage_total Spans por estágio e resultado.", "# TYPE reels_stage_total counter"]
+            for (stage, status), n in sorted(self.count.items()):
+                out.append(f'reels_stage_total{{stage="{stage}",status="{status}"}} {n}')
+            out += ["# HELP reels_stage_bytes_total Bytes transferidos/gerados por estágio.",
+                    "# TYPE reels_stage_bytes_total counter"]
+            for stage, n in sorted(self.bytes.items()):
+                out.append(f'reels_stage_bytes_total{{stage="{stage}"}} {n}')
+            out += ["# HELP reels_stage_retries_total Tentativas extras por estágio.",
+                    "# TYPE reels_stage_retries_total counter"]
+            for stage, n in sorted(self.retries.items()):
+                out.append(f'reels_stage_retries_total{{stage="{stage}"}} {n}')
+        return "\n".join(out) + "\n"
+
+    def serve(self, host="127.0.0.1", port=9108):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                raw = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=httpd.serve_forever, name="metrics-http", daemon=True).start()
+        return httpd
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# arquivo: net.py
+"""
+Camada de rede assíncrona (httpx + asyncio) com fachada síncrona.
+  - um event loop numa thread de fundo e um httpx.AsyncClient com pool de
+    conexões e HTTP/2 (quando o servidor e o pacote h2 permitem)
+  - AsyncSession.get/post/request: mesma cara do requests.Session usado no
+    robô (params, data, headers, files, timeout, stream), resposta compatível
+    (status_code, headers, text, json(), iter_content, raise_for_status) e
+    erros convertidos para requests.* (o tratamento existente continua valendo)
+  - AsyncSession.arequest / gather: para quem quiser disparar muitas chamadas
+    de uma vez no mesmo loop
+Sem httpx instalado, make_session() devolve um requests.Session comum.
+Config (.env): NET_BACKEND (auto | httpx | requests), NET_MAX_CONNECTIONS, NET_HTTP2
+"""
+
+import asyncio
+import threading
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # opcional: sem httpx, fica no requests
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (httpx só fala HTTP/2 com o pacote h2)
+    HAS_H2 = True
+except ImportError:
+    HAS_H2 = False
+
+
+class Response:
+    """Resposta httpx com a interface de requests.Response que o robô usa."""
+
+    def __init__(self, net, r, streamed=False):
+        self._net = net
+        self._r = r
+        self._streamed = streamed
+        self.status_code = r.status_code
+        self.headers = r.headers
+        self.url = str(r.url)
+        self.http_version = r.http_version
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def content(self) -> bytes:
+        if self._streamed:
+            self._net.call(self._r.aread())
+            self._streamed = False
+        return self._r.content
+
+    @property
+    def text(self) -> str:
+        self.content
+        return self._r.text
+
+    def json(self, **kw):
+        self.content
+        return self._r.json(**kw)
+
+    def iter_content(self, chunk_size=64 * 1024):
+        if not self._streamed:
+            data = self._r.content
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i + chunk_size]
+            return
+        it = self._r.aiter_bytes(chunk_size)
+        while True:
+            try:
+                chunk = self._net.call(it.__anext__())
+            except StopAsyncIteration:
+                break
+            yield chunk
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            # lê o corpo do erro (pequeno) e devolve a conexão ao pool: o httpx não
+            # libera sozinho uma resposta em streaming que ninguém fecha
+            try:
+                self.content
+            finally:
+                self.close()
+            raise requests.HTTPError(f"{self.status_code} para {self.url}", response=self)
+
+    def close(self):
+        if self._streamed:
+            self._net.call(self._r.aclose())
+            self._streamed = False
+
+
+def _translate(e: Exception) -> Exception:
+    if isinstance(e, httpx.TimeoutException):
+        return requests.Timeout(str(e) or type(e).__name__)
+    if isinstance(e, httpx.TransportError):
+        return requests.ConnectionError(str(e) or type(e).__name__)
+    if isinstance(e, httpx.HTTPError):
+        return requests.RequestException(str(e) or type(e).__name__)
+    return e
+
+
+class AsyncSession:
+    def __init__(self, headers=None, max_connections=50, http2=True, retries=3, timeout=30.0):
+        self.headers = requests.structures.CaseInsensitiveDict(headers or {})
+        self.timeout = timeout
+        self.http2 = http2 and HAS_H2
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="net-loop", daemon=True)
+        self._thread.start()
+
+        async def build():
+            limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            transport = httpx.AsyncHTTPTransport(retries=retries, http2=self.http2, limits=limits)
+            return httpx.AsyncClient(transport=transport, http2=self.http2, follow_redirects=True)
+        self.client = self.call(build())
+
+    def call(self, coro):
+        """Roda a corrotina no loop de fundo e espera o resultado (thread-safe)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    # ---- async ----
+    async def arequest(self, method, url, params=None, data=None, headers=None, files=None,
+                       json=None, timeout=None, stream=False):
+        h = dict(self.headers)
+        h.update(headers or {})
+        kw = {"params": params, "headers": h, "files": files, "json": json}
+        if isinstance(data, (bytes, bytearray)):
+            kw["content"] = bytes(data)
+        else:
+            kw["data"] = data
+        try:
+            req = self.client.build_request(method, url, timeout=timeout or self.timeout,
+                                            **{k: v for k, v in kw.items() if v is not None})
+            r = await self.client.send(req, stream=stream)
+        except httpx.HTTPError as e:
+            raise _translate(e) from e
+        return Response(self, r, streamed=stream)
+
+    async def agather(self, calls, return_exceptions=True):
+        return await asyncio.gather(*(self.arequest(m, u, **kw) for m, u, kw in calls),
+                                    return_exceptions=return_exceptions)
+
+    # ---- fachada síncrona ----
+    def request(self, method, url, **kw):
+        return self.call(self.arequest(method.upper(), url, **kw))
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+    def post(self, url, **kw):
+        return self.request("POST", url, **kw)
+
+    def gather(self, calls, return_exceptions=True):
+        """Várias chamadas [(método, url, kwargs)] em paralelo no loop; respostas na mesma ordem."""
+        return self.call(self.agather(calls, return_exceptions))
+
+    def close(self):
+        self.call(self.client.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def make_session(backend="auto", headers=None, max_connections=50, http2=True):
+    """AsyncSession (httpx) ou requests.Session, conforme backend e o que está instalado."""
+    if backend != "requests" and httpx is not None:
+        return AsyncSession(headers=headers, max_connections=max_connections, http2=http2)
+    if backend == "httpx":
+        raise RuntimeError("NET_BACKEND=httpx mas o pacote httpx não está instalado")
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(max_retries=3, pool_maxsize=max_connections)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update(headers or {})
+    return s
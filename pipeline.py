@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# arquivo: pipeline.py
+"""
+Pipeline em estágios com filas limitadas entre eles.
+Cada estágio tem seu próprio pool de threads; enquanto o post N sobe pro
+Cloudinary, o post N+1 já está sendo renderizado/codificado.
+  - stage fn recebe o item e devolve o item (segue) ou None (encerra ali)
+  - exceção no estágio encerra o item e vai pro on_error(stage, item, exc)
+  - filas com maxsize => backpressure: submit() bloqueia se o 1º estágio lotar
+"""
+
+import queue
+import threading
+
+_STOP = object()
+
+
+class Stage:
+    def __init__(self, name: str, fn, workers: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+
+
+class Pipeline:
+    def __init__(self, stages, queue_size: int = 2, on_error=None):
+        self.stages = list(stages)
+        self.queues = [queue.Queue(maxsize=max(1, int(queue_size))) for _ in self.stages]
+        self.on_error = on_error
+        self._threads = []
+        self._pending = 0
+        self._cond = threading.Condition()
+
+    # ---- ciclo de vida ----
+    def start(self):
+        for i, st in enumerate(self.stages):
+            for n in range(st.workers):
+                t = threading.Thread(target=self._worker, args=(i,), name=f"{st.name}-{n}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        return self
+
+    def submit(self, item):
+        """Enfileira no 1º estágio (bloqueia se a fila estiver cheia)."""
+        with self._cond:
+            self._pending += 1
+        self.queues[0].put(item)
+
+    def join(self):
+        """Espera todos os itens submetidos terminarem (ok ou com erro)."""
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+
+    def close(self):
+        """Drena e encerra as threads, estágio por estágio."""
+        self.join()
+        for i, st in enumerate(self.stages):
+            for _ in range(st.workers):
+                self.queues[i].put(_STOP)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- interno ----
+    def _done(self):
+        with self._cond:
+            self._pending -= 1
+            if not self._pending:
+                self._cond.notify_all()
+
+    def _worker(self, i: int):
+        st = self.stages[i]
+        q_in = self.queues[i]
+        q_out = self.queues[i + 1] if i + 1 < len(self.queues) else None
+        while True:
+            item = q_in.get()
+            if item is _STOP:
+                return
+            try:
+                res = st.fn(item)
+            except Exception as e:
+                if self.on_error:
+                    try:
+                        self.on_error(st.name, item, e)
+                    except Exception:
+                        pass
+                self._done()
+                continue
+            if res is None or q_out is None:
+                self._done()
+            else:
+                q_out.put(res)
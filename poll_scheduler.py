@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# arquivo: poll_scheduler.py
+"""
+Intervalo adaptativo entre ciclos do loop principal.
+  - aprende o ritmo do site com a data (GMT) dos posts vistos: quantos posts
+    saem em cada hora do dia (hora local), nos últimos `history_days`
+  - intervalo = o tempo para sair ~`target_posts` posts no ritmo da hora
+    atual, limitado a [min_s, base_s]; só passa de base_s (até max_s) nas
+    horas quase sem posts (ritmo < `quiet_rate`); sem histórico usa base_s
+  - desconta a duração do ciclo e volta na hora se ficou backlog
+Estado em out/poll_stats.json (ids e datas dos posts recentes).
+"""
+
+import datetime
+import json
+import time
+from pathlib import Path
+
+
+def _gmt_ts(date_gmt: str) -> float | None:
+    try:
+        d = datetime.datetime.fromisoformat(date_gmt)
+    except (TypeError, ValueError):
+        return None
+    return d.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class PollScheduler:
+    def __init__(self, path: Path, base_s=300.0, min_s=60.0, max_s=1800.0,
+                 target_posts=0.3, history_days=28, quiet_rate=0.05):
+        self.path = Path(path)
+        self.base_s = base_s
+        self.min_s = min_s
+        self.max_s = max_s
+        self.target_posts = target_posts
+        self.history_days = history_days
+        self.quiet_rate = quiet_rate  # posts/hora abaixo disso = hora parada
+        self.seen = {}    # post id -> timestamp (GMT)
+        self._load()
+
+    def _load(self):
+        try:
+            self.seen = {str(k): float(v) for k, v in
+                         json.loads(self.path.read_text(encoding="utf-8")).get("seen", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            self.seen = {}
+
+    def _save(self):
+        try:
+            self.path.write_text(json.dumps({"seen": self.seen}), encoding="utf-8")
+        except OSError:
+            pass
+
+    def observe(self, posts, now=None):
+        """Registra a data dos posts vistos no ciclo (ids repetidos contam uma vez)."""
+        now = now or time.time()
+        horizon = now - self.history_days * 86400
+        for p in posts:
+            ts = _gmt_ts(p.get("date_gmt"))
+            if ts and ts >= horizon:
+                self.seen[str(p["id"])] = ts
+        self.seen = {k: v for k, v in self.seen.items() if v >= horizon}
+        self._save()
+
+    def hourly_rate(self, now=None) -> float | None:
+        """Posts por hora esperados na hora local de `now` (None = pouco histórico)."""
+        now = now or time.time()
+        if len(self.seen) < 5:
+            return None
+        span_days = min(self.history_days, max(1.0, (now - min(self.seen.values())) / 86400))
+        counts = [0] * 24
+        for ts in self.seen.values():
+            counts[time.localtime(ts).tm_hour] += 1
+        h = time.localtime(now).tm_hour
+        # suaviza com as horas vizinhas (um post às 10h59 conta para as 11h)
+        smoothed = 0.25 * counts[(h - 1) % 24] + 0.5 * counts[h] + 0.25 * counts[(h + 1) % 24]
+        return smoothed / span_days
+
+    def interval(self, now=None) -> float:
+        rate = self.hourly_rate(now)
+        if rate is None:
+            return self.base_s
+        if rate < self.quiet_rate:
+            return self.max_s
+        # hora com movimento: nunca espera mais que o intervalo fixo de antes
+        return min(self.base_s, max(self.min_s, self.target_posts / rate * 3600))
+
+    def next_delay(self, cycle_s: float, backlog: bool, now=None) -> float:
+        """Quanto dormir depois de um ciclo que levou cycle_s segundos."""
+        if backlog:
+            return 0.0
+        return max(0.0, self.interval(now) - cycle_s)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# arquivo: post_html.py
+"""
+Extração do HTML do post numa passada só, com cache por post:
+  - título limpo (sem tags, entidades resolvidas)
+  - 1º <img> do conteúdo (src, srcset, width, height); a varredura para nele,
+    sem montar a árvore do documento inteiro
+  - pistas de categoria: título cru (com emojis/tags) e ids de categoria
+html.parser da stdlib parando no 1º <img> saiu mais rápido que o lxml (que
+processa o bloco inteiro que recebe) e ordens de grandeza mais que montar a
+árvore do bs4 para o documento inteiro.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html import unescape
+from html.parser import HTMLParser
+
+
+@dataclass(frozen=True)
+class PostRecord:
+    title: str
+    title_raw: str
+    img_src: str | None = None
+    img_srcset: str = ""
+    img_width: str | None = None
+    img_height: str | None = None
+    category_ids: tuple = field(default_factory=tuple)
+
+
+class _Found(Exception):
+    pass
+
+
+class _TextParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_data(self, data):
+        data = data.strip()
+        if data:
+            self.parts.append(data)
+
+
+class _FirstImgParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.img = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "img":
+            self.img = dict(attrs)
+            raise _Found
+
+
+def clean_text(html: str) -> str:
+    """Texto do fragmento (pedaços separados por espaço), como get_text(" ", strip=True)."""
+    if "<" not in html and "&" not in html:
+        return html.strip()
+    p = _TextParser()
+    p.feed(html)
+    p.close()
+    return unescape(" ".join(p.parts))
+
+
+def first_img_attrs(html: str) -> dict | None:
+    """Atributos do 1º <img> (None se não houver)."""
+    if "<img" not in html.lower():
+        return None
+    p = _FirstImgParser()
+    try:
+        p.feed(html)
+        p.close()
+    except _Found:
+        pass
+    return p.img
+
+
+def _key(post) -> tuple:
+    content = (post.get("content") or {}).get("rendered", "") or ""
+    title = (post.get("title") or {}).get("rendered", "") or ""
+    digest = hashlib.blake2b((title + "\0" + content).encode("utf-8"), digest_size=12).digest()
+    return post.get("id"), digest
+
+
+_CACHE = OrderedDict()
+_LOCK = threading.Lock()
+_MAX = 256
+
+
+def post_record(post) -> PostRecord:
+    """Registro do post (em cache pelo id + hash do título/conteúdo)."""
+    key = _key(post)
+    with _LOCK:
+        rec = _CACHE.get(key)
+        if rec is not None:
+            _CACHE.move_to_end(key)
+            return rec
+    title_raw = (post.get("title") or {}).get("rendered", "") or ""
+    img = first_img_attrs((post.get("content") or {}).get("rendered", "") or "") or {}
+    rec = PostRecord(
+        title=clean_text(title_raw),
+        title_raw=title_raw,
+        img_src=img.get("src") or None,
+        img_srcset=img.get("srcset") or "",
+        img_width=img.get("width"),
+        img_height=img.get("height"),
+        category_ids=tuple(post.get("categories") or ()),
+    )
+    with _LOCK:
+        _CACHE[key] = rec
+        while len(_CACHE) > _MAX:
+            _CACHE.popitem(last=False)
+    return rec
@@ -0,0 +1,513 @@
+# -*- coding: utf-8 -*-
+# arquivo: standin_server.py
+"""
+Servidor HTTP local que imita o WordPress, a Graph API e o Cloudinary nos
+endpoints usados pelo robô, para testar o fluxo inteiro sem tocar em conta real.
+  WordPress (--posts N posts sintéticos, com foto):
+  - /wp-json/wp/v2/posts       (per_page, page, order, after, _fields, _embed,
+                                X-WP-TotalPages, ETag/If-None-Match)
+  - /wp-json/wp/v2/posts/{id}  e  /wp-content/uploads/post-{id}[-{w}x{h}].jpg
+  Graph:
+  - /{v}/{page}/videos       (file_url, ou upload em fases start/transfer/finish)
+  - /{v}/{ig}/media          (video_url, ou upload_type=resumable)
+  - /ig-api-upload/{v}/{id}  (rupload: cabeçalhos offset / file_size)
+  - /{v}/{id}?fields=status_code   e   /{v}/{ig}/media_publish
+  Cloudinary:
+  - /v1_1/{cloud}/video/upload (upload_large em pedaços) e /res/... (o mp4 enviado)
+  - /_standin/stats            contadores, pico de requisições simultâneas
+--finish-delay S: o container fica IN_PROGRESS por S segundos depois do vídeo
+chegar; --ig-error-rate P: fração dos containers que terminam em ERROR;
+--error-rate P: fração das chamadas de API (Graph/Cloudinary) que voltam 500;
+--fail-every N derruba 1 de cada N pedaços (testa a retomada);
+--throttle-every N responde 1 de cada N chamadas da Graph com erro 613
+(limite) e todas levam X-App-Usage crescente; --latency-ms soma atraso fixo.
+Uso (teste de carga com backlog de 50 posts):
+  python standin_server.py --posts 50 --finish-delay 5 --error-rate 0.05
+  .env: WP_URL=http://127.0.0.1:8765  GRAPH_URL=http://127.0.0.1:8765
+        RUPLOAD_URL=http://127.0.0.1:8765  CLOUDINARY_UPLOAD_PREFIX=http://127.0.0.1:8765
+        CLOUDINARY_CLOUD_NAME=standin  CLOUDINARY_API_KEY=x  CLOUDINARY_API_SECRET=x
+        USER_ACCESS_TOKEN=x  FACEBOOK_PAGE_ID=p  INSTAGRAM_ID=i  OUT_DIR=out_standin
+        (UPLOAD_TRANSPORT=graph para o upload direto)
+  sem cursor o robô só pega os 5 mais novos; para o backlog inteiro, antes:
+    echo {"date_gmt": "2000-01-01T00:00:00", "id": 0} > out_standin/wp_cursor.json
+  e compare out_standin/metrics.jsonl e /_standin/stats entre execuções.
+"""
+
+import argparse
+import datetime
+import email.parser
+import email.policy
+import hashlib
+import io
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, parse_qsl, urlparse
+
+TITLES = [
+    "Prefeitura anuncia novo horário dos ônibus a partir de segunda-feira",
+    "🚨 Polícia prende suspeito de furtos em série no centro",
+    "Ressaca deve atingir o litoral neste fim de semana; veja as recomendações",
+    "Pronto Falei ‼️ A obra da avenida já passou do prazo de novo",
+    "Feira de artesanato ocupa a orla com 120 expositores até domingo",
+    "Câmara aprova projeto que reorganiza o transporte coletivo e cria faixas exclusivas na orla",
+]
+CATEGORIES = [(3, "Cidades", "cidades"), (4, "Polícia", "policia"), (5, "Tempo", "tempo")]
+IMG_W, IMG_H = 1600, 1000
+IMG_SIZES = {"medium_large": (768, 480), "large": (1200, 750), "full": (IMG_W, IMG_H)}
+
+
+class GraphState:
+    def __init__(self, chunk_size=1 << 20, fail_every=0, throttle_every=0, posts=0,
+                 finish_delay=0.0, error_rate=0.0, ig_error_rate=0.0, latency_ms=0, seed=0):
+        self.chunk_size = chunk_size
+        self.fail_every = fail_every
+        self.throttle_every = throttle_every
+        self.finish_delay = finish_delay
+        self.error_rate = error_rate
+        self.ig_error_rate = ig_error_rate
+        self.latency = latency_ms / 1000
+        self.rnd = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1000)
+        self.sessions = {}    # upload_session_id -> {"size", "data", "video_id"}
+        self.containers = {}  # container id -> {"size", "data", "status", "ready_at", "outcome"}
+        self.videos = {}      # video_id -> descrição
+        self.published = []
+        self.requests = 0
+        self.uploads = {}     # public_id do Cloudinary -> bytes
+        self.parts = {}       # X-Unique-Upload-Id -> bytearray
+        self.images = {}      # nome do arquivo -> JPEG
+        self.routes = {}      # rota -> chamadas
+        self.injected = 0
+        self.inflight = 0
+        self.inflight_peak = 0
+        self.started = time.time()
+        self.posts = make_posts(posts)
+
+    def new_id(self) -> str:
+        return str(next(self.ids))
+
+    def should_throttle(self) -> bool:
+        with self.lock:
+            self.calls += 1
+            return bool(self.throttle_every) and self.calls % self.throttle_every == 0
+
+    def usage(self) -> str:
+        return json.dumps({"call_count": min(100, self.calls), "total_time": 1, "total_cputime": 1})
+
+    def should_fail(self) -> bool:
+        self.requests += 1
+        return bool(self.fail_every) and self.requests % self.fail_every == 0
+
+    def should_error(self) -> bool:
+        with self.lock:
+            hit = self.rnd.random() < self.error_rate
+            self.injected += hit
+            return hit
+
+    # ---- containers do IG ----
+    def video_arrived(self, c):
+        """Vídeo completo: processa por finish_delay e termina FINISHED ou ERROR."""
+        c["ready_at"] = time.monotonic() + self.finish_delay
+        c["outcome"] = "ERROR" if self.rnd.random() < self.ig_error_rate else "FINISHED"
+        c["status"] = "IN_PROGRESS" if self.finish_delay > 0 else c["outcome"]
+
+    def status(self, c) -> str:
+        if c.get("ready_at") is not None and time.monotonic() >= c["ready_at"]:
+            c["status"] = c["outcome"]
+        return c["status"]
+
+    def stats(self) -> dict:
+        with self.lock:
+            by_status = {}
+            for c in self.containers.values():
+                st = self.status(c)
+                by_status[st] = by_status.get(st, 0) + 1
+            return {"uptime_s": round(time.time() - self.started, 1), "routes": dict(self.routes),
+                    "inflight_peak": self.inflight_peak, "errors_injected": self.injected,
+                    "posts": len(self.posts), "videos": len(self.videos), "published": len(self.published),
+                    "containers": by_status, "cloudinary_uploads": len(self.uploads)}
+
+
+# ====== WordPress sintético ======
+def make_posts(n, now=None) -> list[dict]:
+    """n posts, 1 por minuto até agora (mais novo primeiro), com foto e categoria."""
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).replace(microsecond=0, tzinfo=None)
+    posts = []
+    for i in range(n):
+        pid = 9_000_001 + i   # longe dos ids do site de verdade
+        cat = CATEGORIES[i % len(CATEGORIES)]
+        date = now - datetime.timedelta(minutes=n - 1 - i)
+        posts.append({"id": pid, "date_gmt": date.isoformat(), "modified_gmt": date.isoformat(),
+                      "title": {"rendered": f"{TITLES[i % len(TITLES)]} ({pid})"},
+                      "excerpt": {"rendered": ""}, "link": f"/?p={pid}", "categories": [cat[0]],
+                      "featured_media": pid, "_cat": cat})
+    posts.reverse()
+    return posts
+
+
+def image_url(base, pid, size=None) -> str:
+    w, h = IMG_SIZES[size or "full"]
+    suffix = "" if (w, h) == (IMG_W, IMG_H) else f"-{w}x{h}"
+    return f"{base}/wp-content/uploads/post-{pid}{suffix}.jpg"
+
+
+def render_post(p, base, fields, embed) -> dict:
+    pid = p["id"]
+    srcset = ", ".join(f"{image_url(base, pid, k)} {w}w" for k, (w, h) in IMG_SIZES.items())
+    out = {k: v for k, v in p.items() if not k.startswith("_")}
+    out["link"] = base + p["link"]
+    out["content"] = {"rendered": f'<p>Texto do post {pid}.</p><figure><img src="{image_url(base, pid)}" '
+                                  f'width="{IMG_W}" height="{IMG_H}" srcset="{srcset}" /></figure>'}
+    if embed:
+        cat = p["_cat"]
+        out["_links"] = {"wp:featuredmedia": [{"href": f"{base}/wp-json/wp/v2/media/{pid}"}]}
+        out["_embedded"] = {
+            "wp:featuredmedia": [{"id": pid, "media_type": "image", "source_url": image_url(base, pid),
+                                  "media_details": {"sizes": {
+                                      k: {"width": w, "height": h, "source_url": image_url(base, pid, k)}
+                                      for k, (w, h) in IMG_SIZES.items()}}}],
+            "wp:term": [[{"id": cat[0], "name": cat[1], "slug": cat[2], "taxonomy": "category"}]],
+        }
+    if fields:
+        out = {k: v for k, v in out.items() if k in fields}
+    return out
+
+
+def post_image(pid, w, h) -> bytes:
+    """JPEG sintético (gradiente na cor do post)."""
+    from PIL import Image, ImageDraw
+    rnd = random.Random(pid)
+    img = Image.linear_gradient("L").resize((w, h)).convert("RGB")
+    tint = Image.new("RGB", (w, h), tuple(rnd.randrange(40, 220) for _ in range(3)))
+    img = Image.blend(img, tint, 0.6)
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rnd.randrange(w), rnd.randrange(h)
+        r = rnd.randrange(w // 20, w // 5)
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=tuple(rnd.randrange(256) for _ in range(3)))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def parse_form(handler) -> dict:
+    n = int(handler.headers.get("Content-Length") or 0)
+    body = handler.rfile.read(n)
+    ctype = handler.headers.get("Content-Type", "")
+    if ctype.startswith("multipart/form-data"):
+        msg = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            b"Content-Type: " + ctype.encode() + b"\r\n\r\n" + body)
+        form = {}
+        for part in msg.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True)
+            form[name] = payload if part.get_filename() else payload.decode("utf-8")
+        return form
+    if ctype.startswith("application/x-www-form-urlencoded"):
+        return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+    return {"_body": body}
+
+
+class Handler(BaseHTTPRequestHandler):
+    state: GraphState = None
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def send_body(self, code, raw: bytes, ctype, **headers):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        for k, v in headers.items():
+            self.send_header(k.replace("_", "-"), v)
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def reply(self, code, obj, **headers):
+        self.send_body(code, json.dumps(obj).encode("utf-8"), "application/json",
+                       X_App_Usage=self.state.usage(), **headers)
+
+    def error(self, code, message, **data):
+        err = {"message": message, "type": "OAuthException", "code": 100}
+        if data:
+            err["error_data"] = data
+        self.reply(code, {"error": err})
+
+    def throttled(self):
+        self.reply(400, {"error": {"message": "Application request limit reached", "type": "OAuthException",
+                                   "code": 613, "is_transient": True}})
+
+    def injected(self):
+        self.reply(500, {"error": {"message": "An unexpected error has occurred (simulated)",
+                                   "type": "OAuthException", "code": 2, "is_transient": True}})
+
+    def base_url(self) -> str:
+        return f"http://{self.headers.get('Host')}"
+
+    # ---- entrada: conta rota e simultaneidade ----
+    def handle_one_request(self):
+        st = self.state
+        with st.lock:
+            st.inflight += 1
+            st.inflight_peak = max(st.inflight_peak, st.inflight)
+        try:
+            super().handle_one_request()
+        finally:
+            with st.lock:
+                st.inflight -= 1
+
+    def route(self, name):
+        with self.state.lock:
+            self.state.routes[name] = self.state.routes.get(name, 0) + 1
+        if self.state.latency:
+            time.sleep(self.state.latency)
+
+    # ---- GET ----
+    def do_GET(self):
+        u = urlparse(self.path)
+        parts = u.path.strip("/").split("/")
+        if u.path == "/_standin/stats":
+            return self.reply(200, self.state.stats())
+        if parts[0] == "wp-json":
+            return self.wp(parts, parse_qs(u.query))
+        if parts[0] == "wp-content":
+            return self.wp_image(parts[-1])
+        if parts[0] == "res":
+            return self.cloud_asset(u.path)
+        self.route("graph GET")
+        st = self.state
+        if st.should_throttle():
+            return self.throttled()
+        with st.lock:
+            c = st.containers.get(parts[-1])
+            status = st.status(c) if c is not None else None
+        if c is None:
+            return self.error(404, "unknown object")
+        self.reply(200, {"id": parts[-1], "status_code": status})
+
+    # ---- POST ----
+    def do_POST(self):
+        parts = urlparse(self.path).path.strip("/").split("/")
+        if parts[0] == "ig-api-upload":
+            return self.rupload(parts[-1])
+        if parts[0] == "v1_1":
+            return self.cloud_upload(parts)
+        form = parse_form(self)
+        edge = parts[-1]
+        self.route(f"graph {edge}")
+        if self.state.should_throttle():
+            return self.throttled()
+        if form.get("upload_phase") not in ("transfer", "finish") and self.state.should_error():
+            return self.injected()
+        if edge == "videos":
+            return self.videos(form)
+        if edge == "media":
+            return self.media(form)
+        if edge == "media_publish":
+            return self.media_publish(form)
+        self.error(404, f"unknown edge {edge}")
+
+    # ---- WordPress ----
+    def wp(self, parts, q):
+        self.route("wp posts")
+        one = lambda k, d=None: (q.get(k) or [d])[0]
+        fields = set(one("_fields").split(",")) if one("_fields") else None
+        embed = "_embed" in q
+        base = self.base_url()
+        st = self.state
+        if parts[-1].isdigit():
+            post = next((p for p in st.posts if str(p["id"]) == parts[-1]), None)
+            if post is None:
+                return self.reply(404, {"code": "rest_post_invalid_id", "message": "Invalid post ID."})
+            return self.reply(200, render_post(post, base, fields, embed))
+        posts = st.posts
+        if one("after"):
+            after = datetime.datetime.fromisoformat(one("after")).replace(tzinfo=None)
+            posts = [p for p in posts if datetime.datetime.fromisoformat(p["date_gmt"]) > after]
+        if one("order", "desc") == "asc":
+            posts = posts[::-1]
+        per_page = min(100, int(one("per_page", 10)))
+        page = int(one("page", 1))
+        total_pages = max(1, -(-len(posts) // per_page))
+        if page > total_pages:
+            return self.reply(400, {"code": "rest_post_invalid_page_number",
+                                    "message": "The page number requested is larger than the number of pages available."})
+        data = [render_post(p, base, fields, embed) for p in posts[(page - 1) * per_page:page * per_page]]
+        raw = json.dumps(data).encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(raw).hexdigest()[:16]
+        headers = {"ETag": etag, "X-WP-Total": str(len(posts)), "X-WP-TotalPages": str(total_pages)}
+        if self.headers.get("If-None-Match") == etag:
+            return self.send_body(304, b"", "application/json", **headers)
+        self.send_body(200, raw, "application/json", **headers)
+
+    def wp_image(self, name):
+        self.route("wp image")
+        m = re.fullmatch(r"post-(\d+)(?:-(\d+)x(\d+))?\.jpg", name)
+        if not m:
+            return self.send_body(404, b"", "text/plain")
+        w, h = (int(m[2]), int(m[3])) if m[2] else (IMG_W, IMG_H)
+        st = self.state
+        with st.lock:
+            raw = st.images.get(name)
+        if raw is None:
+            raw = post_image(int(m[1]), w, h)
+            with st.lock:
+                st.images[name] = raw
+        self.send_body(200, raw, "image/jpeg", ETag='"%s"' % name)
+
+    # ---- Cloudinary ----
+    def cloud_upload(self, parts):
+        st = self.state
+        self.route("cloudinary upload")
+        form = parse_form(self)
+        if st.should_error():
+            return self.reply(500, {"error": {"message": "simulated failure"}})
+        chunk = form.get("file") or b""
+        crange = re.match(r"bytes (\d+)-(\d+)/(\d+)", self.headers.get("Content-Range", ""))
+        start, end, total = (int(crange[1]), int(crange[2]), int(crange[3])) if crange else (0, len(chunk) - 1, len(chunk))
+        upload_id = self.headers.get("X-Unique-Upload-Id") or st.new_id()
+        public_id = "/".join(x for x in (form.get("folder"), form.get("public_id") or f"v{upload_id}") if x)
+        with st.lock:
+            buf = st.parts.setdefault(upload_id, bytearray())
+            if start != len(buf):
+                return self.reply(400, {"error": {"message": f"Content-Range {start} != {len(buf)}"}})
+            buf += chunk
+            if end + 1 < total:
+                return self.reply(200, {"done": False, "public_id": public_id})
+            st.uploads[public_id] = bytes(st.parts.pop(upload_id))
+        url = f"{self.base_url()}/res/{parts[1]}/video/upload/{public_id}.mp4"
+        self.reply(200, {"public_id": public_id, "resource_type": "video", "format": "mp4",
+                         "bytes": total, "url": url, "secure_url": url})
+
+    def cloud_asset(self, path):
+        self.route("cloudinary asset")
+        public_id = path.split("/video/upload/", 1)[-1].rsplit(".", 1)[0]
+        with self.state.lock:
+            raw = self.state.uploads.get(public_id)
+        if raw is None:
+            return self.send_body(404, b"", "text/plain")
+        self.send_body(200, raw, "video/mp4")
+
+    # ---- Graph ----
+    def videos(self, form):
+        st = self.state
+        phase = form.get("upload_phase")
+        with st.lock:
+            if phase is None:
+                vid = st.new_id()
+                st.videos[vid] = form.get("description", "")
+                return self.reply(200, {"id": vid})
+            if phase == "start":
+                sid, vid = st.new_id(), st.new_id()
+                size = int(form["file_size"])
+                st.sessions[sid] = {"size": size, "data": bytearray(), "video_id": vid}
+                return self.reply(200, {"upload_session_id": sid, "video_id": vid,
+                                        "start_offset": "0", "end_offset": str(min(st.chunk_size, size))})
+            s = st.sessions.get(form.get("upload_session_id"))
+            if s is None:
+                return self.error(400, "invalid upload session")
+            if phase == "transfer":
+                if st.should_fail():
+                    return self.error(503, "simulated failure")
+                got = len(s["data"])
+                if int(form["start_offset"]) != got:
+                    return self.error(400, "offset mismatch", start_offset=str(got),
+                                      end_offset=str(min(got + st.chunk_size, s["size"])))
+                s["data"] += form["video_file_chunk"]
+                got = len(s["data"])
+                return self.reply(200, {"start_offset": str(got),
+                                        "end_offset": str(min(got + st.chunk_size, s["size"]))})
+            if phase == "finish":
+                if len(s["data"]) != s["size"]:
+                    return self.error(400, "upload incomplete")
+                st.videos[s["video_id"]] = form.get("description", "")
+                return self.reply(200, {"success": True})
+        self.error(400, f"bad upload_phase {phase}")
+
+    def media(self, form):
+        st = self.state
+        with st.lock:
+            cid = st.new_id()
+            if form.get("upload_type") == "resumable":
+                st.containers[cid] = {"size": None, "data": bytearray(), "status": "IN_PROGRESS"}
+                return self.reply(200, {"id": cid, "uri": f"{self.base_url()}/ig-api-upload/v0/{cid}"})
+            c = st.containers[cid] = {"size": 0, "data": bytearray(), "video_url": form.get("video_url")}
+            st.video_arrived(c)
+        self.reply(200, {"id": cid})
+
+    def rupload(self, cid):
+        st = self.state
+        self.route("rupload")
+        n = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(n)
+        with st.lock:
+            c = st.containers.get(cid)
+            if c is None:
+                return self.reply(404, {"debug_info": {"message": "unknown container"}})
+            if st.should_fail():
+                return self.reply(503, {"debug_info": {"message": "simulated failure"}})
+            offset, size = int(self.headers.get("offset", 0)), int(self.headers.get("file_size", 0))
+            if offset != len(c["data"]):
+                return self.reply(400, {"debug_info": {"message": f"offset {offset} != {len(c['data'])}"}})
+            c["size"] = size
+            c["data"] += body
+            if len(c["data"]) >= size:
+                st.video_arrived(c)
+        self.reply(200, {"success": True, "message": "Upload successful."})
+
+    def media_publish(self, form):
+        st = self.state
+        with st.lock:
+            c = st.containers.get(form.get("creation_id"))
+            if c is None or st.status(c) != "FINISHED":
+                return self.error(400, "media not ready")
+            st.published.append(form["creation_id"])
+        self.reply(200, {"id": "m" + form["creation_id"]})
+
+
+def serve(port=8765, chunk_size=1 << 20, fail_every=0, throttle_every=0, host="127.0.0.1", **opts):
+    """Sobe o servidor numa thread e devolve (server, state).
+    opts: posts, finish_delay, error_rate, ig_error_rate, latency_ms, seed (ver GraphState)."""
+    state = GraphState(chunk_size, fail_every, throttle_every, **opts)
+    handler = type("BoundHandler", (Handler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    ap = argparse.ArgumentParser(description="WordPress, Graph API e Cloudinary falsos para testes locais.")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--posts", type=int, default=50, help="posts sintéticos no WordPress falso")
+    ap.add_argument("--chunk-kb", type=int, default=1024, help="tamanho do pedaço do FB")
+    ap.add_argument("--fail-every", type=int, default=0, help="falha 1 de cada N pedaços")
+    ap.add_argument("--throttle-every", type=int, default=0, help="erro 613 em 1 de cada N chamadas")
+    ap.add_argument("--finish-delay", type=float, default=0.0, help="segundos até o container ficar FINISHED")
+    ap.add_argument("--ig-error-rate", type=float, default=0.0, help="fração dos containers que dão ERROR")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fração das chamadas de API com erro 500")
+    ap.add_argument("--latency-ms", type=int, default=0, help="atraso fixo por requisição")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    server, state = serve(args.port, args.chunk_kb * 1024, args.fail_every, args.throttle_every, args.host,
+                          posts=args.posts, finish_delay=args.finish_delay, error_rate=args.error_rate,
+                          ig_error_rate=args.ig_error_rate, latency_ms=args.latency_ms, seed=args.seed)
+    print(f"Stand-in em http://{args.host}:{args.port}  ({args.posts} posts; "
+          f"estatísticas em /_standin/stats; Ctrl+C para sair)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(json.dumps(state.stats(), ensure_ascii=False, indent=2))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# arquivo: template_cache.py
+"""
+Camadas estáticas da arte (faixas, caixa branca, logo, rodapé) montadas uma
+vez por processo — e guardadas em disco por hash da configuração — para que
+cada render só cole a foto e escreva categoria/título por cima.
+  - base:     RGB do tamanho do canvas, com tudo que é fixo já desenhado
+  - overlays: pedaços RGBA que ficam POR CIMA da foto (ex.: logo sobre a foto)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+
+def default_dir() -> Path:
+    """out/templates dentro do OUT_DIR (lido na hora: o .env carrega depois do import)."""
+    return Path(os.getenv("OUT_DIR", str(Path(__file__).parent / "out"))) / "templates"
+
+
+class Template:
+    def __init__(self, base: Image.Image, overlays=()):
+        self.base = base
+        self.overlays = list(overlays)   # [(Image RGBA, (x, y))]
+
+    def compose(self, photo: Image.Image | None = None, photo_xy=(0, 0)) -> Image.Image:
+        canvas = self.base.copy()
+        if photo is not None:
+            canvas.paste(photo, photo_xy)
+        for img, xy in self.overlays:
+            canvas.paste(img, xy, img)
+        return canvas
+
+
+def file_fingerprint(path) -> str:
+    """Hash do conteúdo do arquivo (logo/fonte); '' se não existir."""
+    p = Path(path)
+    if not p.exists():
+        return ""
+    return hashlib.sha256(p.read_bytes()).hexdigest()[:16]
+
+
+def config_key(name: str, config: dict) -> str:
+    raw = json.dumps(config, sort_keys=True, default=str)
+    return f"{name}_{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+
+_MEM = {}
+_LOCK = threading.Lock()
+
+def get_template(name: str, config: dict, builder, cache_dir: Path | None = None) -> Template:
+    """Template do cache (memória -> disco -> builder()).
+    config: tudo que muda o desenho (dimensões, cores, hash do logo/fontes)."""
+    key = config_key(name, config)
+    cache_dir = cache_dir or default_dir()
+    with _LOCK:
+        tpl = _MEM.get(key)
+        if tpl is not None:
+            return tpl
+        tpl = _load(cache_dir, key)
+        if tpl is None:
+            tpl = builder()
+            try:
+                _save(cache_dir, key, tpl)
+            except OSError:
+                pass  # sem disco: segue só com memória
+        _MEM[key] = tpl
+        return tpl
+
+
+def _load(cache_dir: Path, key: str) -> Template | None:
+    manifest = Path(cache_dir) / f"{key}.json"
+    if not manifest.exists():
+        return None
+    try:
+        meta = json.loads(manifest.read_text(encoding="utf-8"))
+        base = Image.open(Path(cache_dir) / meta["base"]).convert("RGB")
+        overlays = [(Image.open(Path(cache_dir) / o["file"]).convert("RGBA"), tuple(o["xy"]))
+                    for o in meta["overlays"]]
+        return Template(base, overlays)
+    except Exception:
+        return None
+
+
+def _save(cache_dir: Path, key: str, tpl: Template):
+    d = Path(cache_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    tpl.base.save(d / f"{key}_base.png")
+    overlays = []
+    for i, (img, xy) in enumerate(tpl.overlays):
+        fn = f"{key}_ov{i}.png"
+        img.save(d / fn)
+        overlays.append({"file": fn, "xy": list(xy)})
+    (d / f"{key}.json").write_text(json.dumps({"base": f"{key}_base.png", "overlays": overlays}), encoding="utf-8")
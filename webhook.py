@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# arquivo: webhook.py
+"""
+Receptor HTTP de webhook de publicação do WordPress (plugin, WP-Cron, etc.).
+  POST /webhook   corpo JSON ou form com o id do post:
+                  {"post_id": 123} | {"ID": 123} | {"id": 123} | {"post": {"ID": 123}}
+                  (se vier post_status diferente de "publish", ignora; id não
+                  numérico ou "post" que não é objeto -> 400)
+  Segredo (opcional): cabeçalho X-Webhook-Secret ou ?secret=...
+Responde 202 na hora e chama on_post(post_id) numa thread à parte; o polling
+continua como rede de segurança.
+Teste local:
+  curl -X POST localhost:8787/webhook -H "X-Webhook-Secret: $WEBHOOK_SECRET" -d '{"post_id": 123}'
+"""
+
+import hmac
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, parse_qsl, urlparse
+
+
+def extract_post_id(payload: dict) -> str | None:
+    """Id do post publicado, normalizado ('0123' -> '123'); None se não houver.
+    ValueError se o corpo estiver malformado (post não-objeto, id não numérico)."""
+    if not isinstance(payload, dict):
+        raise ValueError("corpo não é um objeto")
+    post = payload.get("post")
+    if post is not None and not isinstance(post, dict):
+        raise ValueError("'post' não é um objeto")
+    status = payload.get("post_status") or (post or {}).get("post_status")
+    if status and status != "publish":
+        return None
+    for key in ("post_id", "ID", "id"):
+        v = payload.get(key)
+        if v not in (None, ""):
+            if isinstance(v, bool) or not str(v).isdigit():
+                raise ValueError(f"{key} inválido: {v!r}")
+            return str(int(v))
+    if post:
+        return extract_post_id({k: v for k, v in post.items() if k != "post_status"})
+    return None
+
+
+class WebhookServer:
+    def __init__(self, on_post, host="127.0.0.1", port=8787, secret="", path="/webhook", log=None):
+        self.on_post = on_post
+        self.secret = secret
+        self.path = path
+        self.log = log or (lambda msg, level="INFO": None)
+        self._exec = ThreadPoolExecutor(max_workers=2, thread_name_prefix="webhook")
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.address = self._httpd.server_address
+
+    def _handler(self):
+        srv = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def reply(self, code, obj):
+                raw = json.dumps(obj).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def do_GET(self):
+                self.reply(200 if urlparse(self.path).path == "/health" else 404, {"ok": True})
+
+            def do_POST(self):
+                u = urlparse(self.path)
+                if u.path != srv.path:
+                    return self.reply(404, {"error": "not found"})
+                if srv.secret:
+                    given = self.headers.get("X-Webhook-Secret") or parse_qs(u.query).get("secret", [""])[0]
+                    if not hmac.compare_digest(given.encode(), srv.secret.encode()):
+                        return self.reply(403, {"error": "bad secret"})
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                try:
+                    if "json" in (self.headers.get("Content-Type") or "") or body[:1] in (b"{", b"["):
+                        payload = json.loads(body or b"{}")
+                    else:
+                        payload = dict(parse_qsl(body.decode("utf-8")))
+                except ValueError:
+                    return self.reply(400, {"error": "invalid body"})
+                try:
+                    pid = extract_post_id(payload)
+                except ValueError as e:
+                    return self.reply(400, {"error": str(e)})
+                if not pid:
+                    return self.reply(202, {"queued": False, "reason": "no published post id"})
+                srv._exec.submit(srv._dispatch, pid)
+                self.reply(202, {"queued": True, "post_id": pid})
+
+        return Handler
+
+    def _dispatch(self, pid):
+        try:
+            self.on_post(pid)
+        except Exception as e:
+            self.log(f"❌ Webhook post {pid}: {e}", "ERROR")
+
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, name="webhook-http", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._exec.shutdown(wait=True)